@@ -1,6 +1,25 @@
+import django
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+
+        from api.authentication import token_deleted, user_changed
+        from api.metrics import install_query_counter
+
+        connection_created.connect(install_query_counter)
+        post_delete.connect(token_deleted, sender=Token)
+        post_save.connect(user_changed, sender=settings.AUTH_USER_MODEL)
+        if django.VERSION < (4, 1):
+            from foodgram.db.health import close_unusable_connections
+
+            request_started.connect(close_unusable_connections)
@@ -0,0 +1,124 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.urls import URLPattern
+from rest_framework.request import Request
+
+from api.coalescing import coalescer
+from api.filters import IngredientFilter
+from api.lean_serializers import LeanIngredientSerializer, LeanTagSerializer
+from api.renderers import FastJSONRenderer
+from api.views import IngredientViewSet
+from foodgram.db.health import close_unusable_connections
+from ingredient.models import Ingredient
+from recipe.models import Tag
+
+
+def run_in_thread(func):
+    """Выполняет синхронный код в общем пуле потоков.
+
+    Вызовы не привязаны к единственному потоку sync_to_async, поэтому
+    соединения с БД закрываются так же, как в конце обычного запроса.
+    """
+    def inner(*args, **kwargs):
+        close_old_connections()
+        close_unusable_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False)
+
+
+async def fetch_all(queryset):
+    """Загружает queryset асинхронным ORM, если он доступен."""
+    if hasattr(queryset, 'aiterator'):
+        return [obj async for obj in queryset]
+    return await run_in_thread(list)(queryset)
+
+
+def json_response(data):
+    response = HttpResponse(FastJSONRenderer().render(data),
+                            content_type='application/json')
+    response.cache_compressed = True
+    return response
+
+
+async def tag_list(request):
+    async def load():
+        tags = await fetch_all(Tag.objects.all())
+        return LeanTagSerializer().many(tags)
+
+    return json_response(await coalescer.run_async(
+        ('tags', request.get_full_path()), load
+    ))
+
+
+async def ingredient_list(request):
+    async def load():
+        queryset = IngredientFilter().filter_queryset(
+            Request(request), Ingredient.objects.all(), IngredientViewSet
+        )
+        ingredients = await fetch_all(queryset)
+        return LeanIngredientSerializer().many(ingredients)
+
+    return json_response(await coalescer.run_async(
+        ('ingredients', request.get_full_path()), load
+    ))
+
+
+def render_view(view):
+    def inner(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    return inner
+
+
+def async_view(view, fast_get=None):
+    """Асинхронная обёртка над представлением DRF.
+
+    GET-запросы без суффикса формата обслуживает fast_get, если он
+    задан. Остальные запросы, включая декодирование изображений при
+    записи, выполняются в пуле потоков вместе с рендерингом ответа.
+    """
+    offloaded = run_in_thread(render_view(view))
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if fast_get is not None and request.method == 'GET' and not kwargs:
+            return await fast_get(request)
+        return await offloaded(request, *args, **kwargs)
+
+    return wrapper
+
+
+ASYNC_ROUTES = {
+    'recipes-list': None,
+    'recipes-detail': None,
+    'recipes-download-shopping-cart': None,
+    'tags-list': tag_list,
+    'tags-detail': None,
+    'ingredients-list': ingredient_list,
+    'ingredients-detail': None,
+}
+
+
+def async_urlpatterns(urlpatterns):
+    """Заменяет представления читающих маршрутов на асинхронные."""
+    result = []
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name in ASYNC_ROUTES:
+            pattern = URLPattern(
+                pattern.pattern,
+                async_view(pattern.callback, ASYNC_ROUTES[pattern.name]),
+                pattern.default_args,
+                pattern.name,
+            )
+        result.append(pattern)
+    return result
@@ -0,0 +1,123 @@
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+VERSION_KEY = 'auth-user-version:{}'
+TOKEN_KEY = 'auth-token:{}'
+
+
+class TokenCache:
+    """LRU-кэш снимков пользователей по ключу токена с TTL."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[:2]
+
+    def set(self, key, user, version):
+        with self.lock:
+            self.entries[key] = (user, version, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+local_tokens = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE,
+                          settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def shared_key(key):
+    return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def user_version(user_id):
+    return cache.get(VERSION_KEY.format(user_id))
+
+
+def ensure_user_version(user_id):
+    """Версия пользователя; если её нет в кэше, заводит новую.
+
+    Возвращает None, если кэш не сохранил версию: такой снимок
+    сохранять нельзя.
+    """
+    cache.add(VERSION_KEY.format(user_id), uuid.uuid4().hex, None)
+    return user_version(user_id)
+
+
+def bump_user_version(user_id):
+    """Делает недействительными снимки пользователя во всех процессах."""
+    cache.set(VERSION_KEY.format(user_id), uuid.uuid4().hex, None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к БД на каждый запрос.
+
+    Снимок пользователя хранится в LRU процесса и, если включено
+    AUTH_TOKEN_CACHE_SHARED, в кэше Django. Снимок действителен, пока
+    не истёк TTL и не изменилась версия пользователя в кэше Django,
+    которую меняют удаление токена и сохранение пользователя. Если
+    версия вытеснена из кэша, снимок не используется. Каждый запрос
+    получает свою копию пользователя из снимка.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = local_tokens.get(key)
+        if entry is None and settings.AUTH_TOKEN_CACHE_SHARED:
+            entry = cache.get(shared_key(key))
+            if entry is not None:
+                local_tokens.set(key, *entry)
+        if entry is not None:
+            user, version = entry
+            if version is not None and user_version(user.pk) == version:
+                user = copy.copy(user)
+                return user, self.get_model()(key=key, user=user)
+            local_tokens.discard(key)
+        user, token = super().authenticate_credentials(key)
+        version = ensure_user_version(user.pk)
+        if version is None:
+            return user, token
+        local_tokens.set(key, copy.copy(user), version)
+        if settings.AUTH_TOKEN_CACHE_SHARED:
+            cache.set(shared_key(key), (user, version),
+                      settings.AUTH_TOKEN_CACHE_TTL)
+        return user, token
+
+
+def token_deleted(sender, instance, **kwargs):
+    # После удаления Django обнуляет первичный ключ, то есть key.
+    key, user_id = instance.key, instance.user_id
+    local_tokens.discard(key)
+
+    def invalidate():
+        cache.delete(shared_key(key))
+        bump_user_version(user_id)
+
+    transaction.on_commit(invalidate)
+
+
+def user_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_user_version(instance.pk))
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+from rest_framework.response import Response
+
+
+class Coalescer:
+    """Объединяет одновременные одинаковые вычисления в процессе.
+
+    Первый вызов с ключом выполняет функцию, остальные ждут и получают
+    тот же результат или то же исключение.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._futures = {}
+
+    def run(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def run_async(self, key, func):
+        """То же для корутин в цикле событий воркера ASGI."""
+        future = self._futures.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self._futures[key] = asyncio.ensure_future(func())
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                del self._futures[key]
+            else:
+                future.add_done_callback(
+                    lambda _: self._futures.pop(key, None)
+                )
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+coalescer = Coalescer()
+
+
+class CoalescedListMixin:
+    """Одинаковые одновременные запросы списка вычисляются один раз.
+
+    Подходит для списков, которые не зависят от пользователя и не
+    разбиты на страницы, поэтому их сжатое тело тоже кэшируется.
+    """
+
+    def list(self, request, *args, **kwargs):
+        key = (type(self).__name__, request.get_full_path())
+        data = coalescer.run(
+            key, lambda: self.get_list_data(request, *args, **kwargs)
+        )
+        response = Response(data)
+        response.cache_compressed = True
+        return response
+
+    def get_list_data(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs).data
@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript')
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q=([\d.]+))?')
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, не запрещённые через q=0."""
+    encodings = set()
+    for part in header.split(','):
+        match = ACCEPT_ENCODING_RE.match(part)
+        if match and (match.group(2) is None or float(match.group(2)) > 0):
+            encodings.add(match.group(1).lower())
+    return encodings
+
+
+def preferred_encoding(header):
+    """brotli, если он установлен и поддерживается клиентом, иначе gzip."""
+    encodings = accepted_encodings(header)
+    if brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings:
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding, best=False):
+    """Сжимает тело ответа.
+
+    Для кэшируемых ответов используется максимальная степень сжатия:
+    она оплачивается один раз.
+    """
+    if encoding == 'br':
+        return brotli.compress(content, quality=11 if best else 4)
+    return gzip.compress(content, compresslevel=9 if best else 6, mtime=0)
+
+
+class CompressedCache:
+    """LRU-кэш сжатых тел ответов по хэшу исходного содержимого."""
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_compress(self, content, encoding):
+        key = (encoding, hashlib.blake2b(content, digest_size=16).digest())
+        with self.lock:
+            compressed = self.entries.get(key)
+            if compressed is not None:
+                self.entries.move_to_end(key)
+                return compressed
+        compressed = compress(content, encoding, best=True)
+        with self.lock:
+            self.entries[key] = compressed
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return compressed
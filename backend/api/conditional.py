@@ -0,0 +1,62 @@
+import calendar
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalRetrieveMixin:
+    """Действие retrieve с ответом 304 для неизменившегося объекта.
+
+    Проверка стоит один запрос по первичному ключу: дата изменения
+    объекта и флаги текущего пользователя из get_state_annotations.
+    Флаги меняются без обновления даты, поэтому Last-Modified
+    отдаётся только анонимным пользователям, а авторизованным — ETag.
+    """
+
+    modified_field = 'updated_at'
+
+    def get_state_annotations(self):
+        """Аннотации с состоянием объекта для текущего пользователя."""
+        return {}
+
+    def get_validators(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        annotations = self.get_state_annotations()
+        try:
+            row = self.queryset.model._default_manager.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).annotate(**annotations).values_list(
+                self.modified_field, *annotations
+            ).first()
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if row is None:
+            raise Http404
+        modified, *state = row
+        key = '|'.join((
+            modified.isoformat(),
+            ','.join(str(int(flag)) for flag in state),
+            self.request.accepted_media_type or '',
+            self.request.META.get('QUERY_STRING', ''),
+        ))
+        etag = 'W/' + quote_etag(hashlib.blake2b(
+            key.encode(), digest_size=16
+        ).hexdigest())
+        if self.request.user.is_authenticated:
+            return etag, None
+        return etag, calendar.timegm(modified.utctimetuple())
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(request, etag=etag,
+                                            last_modified=last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
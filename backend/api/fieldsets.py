@@ -0,0 +1,94 @@
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(value):
+    return [name for name in (part.strip() for part in value.split(','))
+            if name]
+
+
+class SparseFieldsSerializerMixin:
+    """Сериализатор с выбором полей и раскрытием вложенных объектов.
+
+    fields оставляет только перечисленные поля, expand — раскрытые
+    вложенные объекты; остальные поля из collapsed_fields заменяются
+    компактными, обычно идентификаторами. None означает «все».
+    """
+
+    collapsed_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if expand is not None:
+            for name, make_field in self.collapsed_fields.items():
+                if name in self.fields and name not in expand:
+                    self.fields[name] = make_field()
+
+
+class SparseFieldsViewMixin:
+    """Параметры ?fields= и ?expand= для чтения объектов.
+
+    Вьюсет передаёт выбранные поля сериализатору и по ним же сокращает
+    queryset: sparse_columns сопоставляет полю ответа колонки модели
+    для .only().
+    """
+
+    sparse_actions = ('list', 'retrieve')
+    sparse_columns = {}
+
+    def get_fieldset(self):
+        """Словарь fields/expand для сериализатора или пустой словарь."""
+        if hasattr(self, '_fieldset'):
+            return self._fieldset
+        self._fieldset = {}
+        if (self.request is None or self.request.method != 'GET'
+                or getattr(self, 'action', None) not in self.sparse_actions):
+            return self._fieldset
+        serializer_class = self.get_serializer_class()
+        available = {
+            FIELDS_PARAM: serializer_class.Meta.fields,
+            EXPAND_PARAM: serializer_class.collapsed_fields,
+        }
+        fieldset, errors = {}, {}
+        for param, names in available.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            fieldset[param] = parse_names(value)
+            unknown = [name for name in fieldset[param] if name not in names]
+            if unknown:
+                errors[param] = f'Неизвестные поля: {", ".join(unknown)}.'
+        if errors:
+            raise ValidationError(errors)
+        self._fieldset = fieldset
+        return fieldset
+
+    def field_wanted(self, name):
+        fields = self.get_fieldset().get(FIELDS_PARAM)
+        return fields is None or name in fields
+
+    def field_expanded(self, name):
+        expand = self.get_fieldset().get(EXPAND_PARAM)
+        return self.field_wanted(name) and (expand is None or name in expand)
+
+    def prune_columns(self, queryset):
+        fields = self.get_fieldset().get(FIELDS_PARAM)
+        if fields is None:
+            return queryset
+        columns = {'id'}
+        for name in fields:
+            columns.update(self.sparse_columns.get(name, ()))
+        return queryset.only(*columns)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.update(self.get_fieldset())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_lean_serializer(self):
+        return self.lean_serializer_class(self.get_serializer_context(),
+                                          **self.get_fieldset())
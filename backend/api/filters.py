@@ -1,3 +1,4 @@
+from django.db.models import Subquery
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
@@ -29,10 +30,12 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    same_ingredients = filters.NumberFilter(method='get_same_ingredients')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'same_ingredients')
 
     def get_is_favorited(self, queryset, name, value):
         if value:
@@ -43,3 +46,8 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def get_same_ingredients(self, queryset, name, value):
+        return queryset.filter(ingredients_hash=Subquery(
+            Recipe.objects.filter(pk=value).values('ingredients_hash')
+        )).exclude(pk=value)
@@ -0,0 +1,177 @@
+from operator import attrgetter
+
+from rest_framework.response import Response
+
+
+def compile_record(*fields):
+    """Функция, собирающая словарь полей объекта одним вызовом attrgetter.
+
+    Поле задаётся именем атрибута или парой (имя в ответе, путь атрибута).
+    """
+    names = tuple(field if isinstance(field, str) else field[0]
+                  for field in fields)
+    getter = attrgetter(*(field if isinstance(field, str) else field[1]
+                          for field in fields))
+    if len(names) == 1:
+        return lambda obj: {names[0]: getter(obj)}
+    return lambda obj: dict(zip(names, getter(obj)))
+
+
+class LeanSerializer:
+    """Представление объектов только для чтения без полей DRF.
+
+    Результат совпадает с ответом соответствующего ModelSerializer.
+    """
+
+    record = None
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    def to_representation(self, obj):
+        return self.record(obj)
+
+    def many(self, objects):
+        to_representation = self.to_representation
+        return [to_representation(obj) for obj in objects]
+
+
+class LeanTagSerializer(LeanSerializer):
+    """Облегчённый сериализатор тегов."""
+
+    record = staticmethod(compile_record('id', 'name', 'color', 'slug'))
+
+
+class LeanIngredientSerializer(LeanSerializer):
+    """Облегчённый сериализатор ингредиентов."""
+
+    record = staticmethod(compile_record('id', 'name', 'measurement_unit'))
+
+
+class LeanRecipeSerializer(LeanSerializer):
+    """Облегчённый сериализатор списка рецептов.
+
+    Рассчитан на queryset из RecipeViewSet.get_queryset: теги,
+    ингредиенты и автор уже загружены, флаги пользователя
+    аннотированы.
+    """
+
+    tag = staticmethod(LeanTagSerializer.record)
+    author = staticmethod(compile_record(
+        'email', 'id', 'username', 'first_name', 'last_name'
+    ))
+    ingredient = staticmethod(compile_record(
+        ('id', 'ingredient.id'),
+        ('name', 'ingredient.name'),
+        ('measurement_unit', 'ingredient.measurement_unit'),
+        'amount',
+    ))
+    head = attrgetter('id', 'tags', 'author', 'recipe')
+    tail = attrgetter('name', 'image', 'image_renditions', 'text',
+                      'cooking_time', 'ingredients_summary')
+
+    fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
+              'is_in_shopping_cart', 'name', 'image', 'image_renditions',
+              'text', 'cooking_time', 'ingredients_summary')
+
+    def __init__(self, context=None, fields=None, expand=None):
+        super().__init__(context)
+        request = self.context.get('request')
+        self.build_absolute_uri = (request.build_absolute_uri
+                                   if request is not None else None)
+        self.getters = None
+        if fields is not None or expand is not None:
+            self.getters = [
+                (name, self.getter(name, expand is None or name in expand))
+                for name in self.fields if fields is None or name in fields
+            ]
+
+    def getter(self, name, expanded):
+        """Функция, возвращающая значение поля ответа по рецепту."""
+        if name == 'tags':
+            if expanded:
+                return lambda recipe: [self.tag(tag)
+                                       for tag in recipe.tags.all()]
+            return lambda recipe: [tag.id for tag in recipe.tags.all()]
+        if name == 'author':
+            if expanded:
+                return lambda recipe: self.author_data(recipe.author)
+            return attrgetter('author_id')
+        if name == 'ingredients':
+            record = (self.ingredient if expanded
+                      else compile_record(('id', 'ingredient_id'), 'amount'))
+            return lambda recipe: [record(item)
+                                   for item in recipe.recipe.all()]
+        if name in ('is_favorited', 'is_in_shopping_cart'):
+            return lambda recipe: getattr(recipe, name, False)
+        if name == 'image':
+            return lambda recipe: self.image_url(recipe.image)
+        if name == 'image_renditions':
+            return lambda recipe: self.rendition_urls(
+                recipe.image, recipe.image_renditions
+            )
+        return attrgetter(name)
+
+    def image_url(self, image):
+        if not image:
+            return None
+        try:
+            url = image.url
+        except AttributeError:
+            return None
+        if self.build_absolute_uri is not None:
+            return self.build_absolute_uri(url)
+        return url
+
+    def rendition_urls(self, image, renditions):
+        urls = {}
+        for width, name in renditions.items():
+            url = image.storage.url(name)
+            urls[width] = (self.build_absolute_uri(url)
+                           if self.build_absolute_uri is not None else url)
+        return urls
+
+    def author_data(self, author):
+        data = self.author(author)
+        data['is_subscribed'] = getattr(author, 'is_subscribed', False)
+        return data
+
+    def to_representation(self, recipe):
+        if self.getters is not None:
+            return {name: get(recipe) for name, get in self.getters}
+        pk, tags, author, ingredients = self.head(recipe)
+        (name, image, renditions, text, cooking_time,
+         summary) = self.tail(recipe)
+        return {
+            'id': pk,
+            'tags': [self.tag(tag) for tag in tags.all()],
+            'author': self.author_data(author),
+            'ingredients': [self.ingredient(item)
+                            for item in ingredients.all()],
+            'is_favorited': getattr(recipe, 'is_favorited', False),
+            'is_in_shopping_cart': getattr(recipe, 'is_in_shopping_cart',
+                                           False),
+            'name': name,
+            'image': self.image_url(image),
+            'image_renditions': self.rendition_urls(image, renditions),
+            'text': text,
+            'cooking_time': cooking_time,
+            'ingredients_summary': summary,
+        }
+
+
+class LeanListMixin:
+    """Действие list через облегчённый сериализатор."""
+
+    lean_serializer_class = None
+
+    def get_lean_serializer(self):
+        return self.lean_serializer_class(self.get_serializer_context())
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_lean_serializer()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.many(page))
+        return Response(serializer.many(queryset))
@@ -0,0 +1,126 @@
+import os
+from contextvars import ContextVar
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+REQUESTS = Counter(
+    'foodgram_requests_total',
+    'Количество запросов к API.',
+    ['view', 'action', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса.',
+    ['view', 'action'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    'foodgram_request_db_queries',
+    'Количество запросов к базе данных за один запрос к API.',
+    ['view', 'action'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Размер тела ответа.',
+    ['view', 'action'],
+    buckets=(128, 512, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+OPERATIONS = Counter(
+    'foodgram_operations_total',
+    'Избранное, список покупок и подписки.',
+    ['operation', 'action'],
+)
+DB_POOL_WAIT = Histogram(
+    'foodgram_db_pool_wait_seconds',
+    'Время получения соединения из пула.',
+    ['alias'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'foodgram_db_pool_connections',
+    'Соединения в пуле.',
+    ['alias', 'state'],
+    multiprocess_mode='livesum',
+)
+JOBS = Counter(
+    'foodgram_jobs_total',
+    'Выполненные фоновые задачи по результату.',
+    ['name', 'outcome'],
+)
+JOB_DURATION = Histogram(
+    'foodgram_job_duration_seconds',
+    'Время выполнения фоновой задачи.',
+    ['name', 'outcome'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+_query_count = ContextVar('query_count', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """Подключает подсчёт запросов к каждому новому соединению с БД."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def start_query_count():
+    counter = [0]
+    _query_count.set(counter)
+    return counter
+
+
+def view_labels(view_func, method):
+    """Имя вьюсета и действия для меток метрик."""
+    view_class = getattr(view_func, 'cls', None)
+    name = view_class.__name__ if view_class else view_func.__name__
+    actions = getattr(view_func, 'actions', None) or {}
+    return name, actions.get(method.lower(), '')
+
+
+def observe_request(labels, method, response, duration, queries):
+    view, action = labels
+    REQUESTS.labels(view, action, method, response.status_code).inc()
+    LATENCY.labels(view, action).observe(duration)
+    DB_QUERIES.labels(view, action).observe(queries)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(view, action).observe(len(response.content))
+
+
+def count_operation(operation, action, amount=1):
+    OPERATIONS.labels(operation, action).inc(amount)
+
+
+def observe_job(name, outcome, duration):
+    JOBS.labels(name, outcome).inc()
+    JOB_DURATION.labels(name, outcome).observe(duration)
+
+
+def get_registry():
+    """Реестр метрик текущего процесса или всех процессов сервиса.
+
+    Под gunicorn и в обработчиках очереди с несколькими процессами
+    значения каждого процесса пишутся в файлы каталога
+    PROMETHEUS_MULTIPROC_DIR и суммируются при чтении.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus."""
+    return HttpResponse(generate_latest(get_registry()),
+                        content_type=CONTENT_TYPE_LATEST)
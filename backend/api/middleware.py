@@ -0,0 +1,103 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.viewsets import ViewSetMixin
+
+from api import compression, metrics
+from foodgram.db import routers
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Сбор метрик по каждому запросу."""
+
+    def process_request(self, request):
+        request.metrics_queries = metrics.start_query_count()
+        request.metrics_started = time.perf_counter()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_labels = metrics.view_labels(view_func,
+                                                     request.method)
+
+    def process_response(self, request, response):
+        if hasattr(request, 'metrics_started'):
+            metrics.observe_request(
+                getattr(request, 'metrics_labels', ('unknown', '')),
+                request.method,
+                response,
+                time.perf_counter() - request.metrics_started,
+                request.metrics_queries[0],
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Направляет чтения вьюсетов на реплику, если она настроена."""
+
+    def __init__(self, get_response):
+        if routers.REPLICA_DB_ALIAS not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_request(self, request):
+        routers.reset_routing()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if (request.method in SAFE_METHODS and view_class is not None
+                and issubclass(view_class, ViewSetMixin)):
+            routers.route_reads_to_replica(request)
+
+    def process_response(self, request, response):
+        routers.reset_routing()
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            routers.pin_to_primary(user)
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжатие ответов brotli или gzip начиная с COMPRESSION_MIN_SIZE байт.
+
+    Ответы с атрибутом cache_compressed = True (неизменные списки тегов
+    и ингредиентов) сжимаются один раз и берутся из кэша процесса.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.cache = compression.CompressedCache(
+            settings.COMPRESSION_CACHE_SIZE
+        )
+
+    def process_response(self, request, response):
+        if (response.streaming or response.has_header('Content-Encoding')
+                or not response.get('Content-Type', '').startswith(
+                    compression.COMPRESSIBLE_TYPES
+                )):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        encoding = compression.preferred_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        if getattr(response, 'cache_compressed', False):
+            content = self.cache.get_or_compress(response.content, encoding)
+        else:
+            content = compression.compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
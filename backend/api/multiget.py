@@ -0,0 +1,42 @@
+from rest_framework.response import Response
+
+from api.fieldsets import parse_names
+from api.serializers import BulkIdsSerializer
+
+IDS_PARAM = 'ids'
+
+
+class MultiGetMixin:
+    """Действие list с параметром ?ids=1,2,3 вместо серии retrieve.
+
+    Объекты выбираются одним запросом get_queryset без пагинации,
+    в порядке ids; id, которых нет, перечисляются в missing.
+    """
+
+    def is_multi_get(self):
+        return (self.request is not None and self.request.method == 'GET'
+                and getattr(self, 'action', None) == 'list'
+                and IDS_PARAM in self.request.query_params)
+
+    def serialize_many(self, objects):
+        if getattr(self, 'lean_serializer_class', None) is not None:
+            return self.get_lean_serializer().many(objects)
+        return self.get_serializer(objects, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_multi_get():
+            return super().list(request, *args, **kwargs)
+        serializer = BulkIdsSerializer(
+            data={'ids': parse_names(request.query_params[IDS_PARAM])}
+        )
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        found = {obj.pk: obj for obj in self.get_queryset().filter(
+            pk__in=ids
+        )}
+        return Response({
+            'results': self.serialize_many(
+                [found[pk] for pk in ids if pk in found]
+            ),
+            'missing': [pk for pk in ids if pk not in found],
+        })
@@ -1,5 +1,12 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class PageFieldPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class FeedPagination(CursorPagination):
+    """Постраничный вывод ленты по ключу даты публикации."""
+
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
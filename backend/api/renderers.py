@@ -0,0 +1,40 @@
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer на orjson, если пакет установлен.
+
+    Типы, которых orjson не знает, в том числе даты, кодируются
+    JSONEncoder из DRF, поэтому ответ совпадает с ответом стандартного
+    рендерера. Отступы и настройки, которые orjson не поддерживает,
+    обрабатываются стандартным рендерером.
+    """
+
+    def __init__(self):
+        self.encoder = self.encoder_class()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Как и JSONRenderer, экранируем U+2028 и U+2029.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace(
+            '\u2029'.encode(), b'\\u2029'
+        )
@@ -1,17 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import transaction
+from django.utils import timezone
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.fieldsets import SparseFieldsSerializerMixin
 from app.models import Favorite, Follow, ShoppingCart
 from ingredient.models import Ingredient
+from jobs.models import Job
+from jobs.queue import enqueue
 from recipe.models import IngredientRecipe, Recipe, Tag
+from recipe.services import build_ingredients_summary, recipes_changed
+from recipe.tasks import DELETE_FILES, IMAGE_RENDITIONS
 from users.models import User
 
 
-class UsersSerializer(UserSerializer):
+class UsersSerializer(SparseFieldsSerializerMixin, UserSerializer):
     """Сериализатор пользователей."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -26,6 +36,8 @@ class UsersSerializer(UserSerializer):
                   'is_subscribed',)
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         if (self.context.get('request')
            and not self.context['request'].user.is_anonymous):
             return Follow.objects.filter(user=self.context['request'].user,
@@ -63,6 +75,16 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeIngredientAmountSerializer(serializers.ModelSerializer):
+    """Сериализатор ингредиента в рецепте без справочных данных."""
+
+    id = serializers.ReadOnlyField(source='ingredient_id')
+
+    class Meta:
+        model = IngredientRecipe
+        fields = ('id', 'amount')
+
+
 class IngredientsEditSerializer(serializers.ModelSerializer):
     """Сериализатор изменения ингридиентов."""
 
@@ -74,15 +96,25 @@ class IngredientsEditSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsSerializerMixin,
+                       serializers.ModelSerializer):
     """Сериализатор рецептов."""
 
+    collapsed_fields = {
+        'author': lambda: PrimaryKeyRelatedField(read_only=True),
+        'tags': lambda: PrimaryKeyRelatedField(many=True, read_only=True),
+        'ingredients': lambda: RecipeIngredientAmountSerializer(
+            many=True, read_only=True, source='recipe'
+        ),
+    }
+
     author = UsersSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     ingredients = RecipeIngredientSerializer(many=True,
                                              required=True,
                                              source='recipe')
     image = Base64ImageField()
+    image_renditions = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
 
@@ -96,10 +128,23 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'is_in_shopping_cart',
                   'name',
                   'image',
+                  'image_renditions',
                   'text',
-                  'cooking_time',)
+                  'cooking_time',
+                  'ingredients_summary',)
+
+    def get_image_renditions(self, obj):
+        request = self.context.get('request')
+        urls = {}
+        for width, name in obj.image_renditions.items():
+            url = obj.image.storage.url(name)
+            urls[width] = (request.build_absolute_uri(url)
+                           if request is not None else url)
+        return urls
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         if (self.context.get('request')
            and self.context['request'].user.is_authenticated):
             return Favorite.objects.filter(user=self.context['request'].user,
@@ -107,6 +152,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         if (self.context.get('request')
            and self.context['request'].user.is_authenticated):
             return ShoppingCart.objects.filter(
@@ -174,17 +221,23 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         ])
 
     def create_tags(self, tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+        recipe.tags.add(*tags)
 
     @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(author=author, **validated_data)
+        summary = build_ingredients_summary(ingredients)
+        recipe = Recipe.objects.create(author=author,
+                                       ingredients_summary=summary,
+                                       ingredients_hash=summary['hash'],
+                                       **validated_data)
         self.create_tags(tags, recipe)
         self.create_ingredient_amount(ingredients, recipe)
+        if recipe.image:
+            enqueue(IMAGE_RENDITIONS, {'recipe_id': recipe.id})
+        transaction.on_commit(lambda: recipes_changed([recipe.id]))
         return recipe
 
     @transaction.atomic
@@ -192,12 +245,29 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         if 'ingredients' in validated_data:
             ingredients = validated_data.pop('ingredients')
             recipe.ingredients.clear()
-            print(ingredients)
             self.create_ingredient_amount(ingredients, recipe)
+            recipe.ingredients_summary = build_ingredients_summary(
+                ingredients
+            )
+            recipe.ingredients_hash = recipe.ingredients_summary['hash']
+            transaction.on_commit(lambda: recipes_changed([recipe.id]))
         if 'tags' in validated_data:
             tags_data = validated_data.pop('tags')
             recipe.tags.set(tags_data)
-        return super().update(recipe, validated_data)
+        stale_files = []
+        if 'image' in validated_data:
+            # Копии старого фото не должны отдаваться с новым.
+            stale_files = [recipe.image.name,
+                           *recipe.image_renditions.values()]
+            recipe.image_renditions = {}
+        recipe = super().update(recipe, validated_data)
+        stale_files = [name for name in stale_files
+                       if name and name != recipe.image.name]
+        if stale_files:
+            enqueue(DELETE_FILES, {'names': stale_files})
+        if 'image' in validated_data and recipe.image:
+            enqueue(IMAGE_RENDITIONS, {'recipe_id': recipe.id})
+        return recipe
 
     def to_representation(self, instance):
         return RecipeSerializer(
@@ -255,6 +325,63 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         ]
 
 
+class BulkIdsSerializer(serializers.Serializer):
+    """Сериализатор списка идентификаторов для пакетных операций."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_SIZE,
+    )
+
+
+class PantrySerializer(serializers.Serializer):
+    """Сериализатор запроса рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.PANTRY_MAX_INGREDIENTS,
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.PANTRY_MAX_RESULTS,
+        default=settings.REST_FRAMEWORK['PAGE_SIZE'],
+    )
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    """Сериализатор рецептов с долей имеющихся ингредиентов."""
+
+    coverage = serializers.FloatField(read_only=True)
+    matched = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('coverage', 'matched')
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор статуса фоновой задачи."""
+
+    file = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'status', 'attempts', 'created', 'finished_at',
+                  'file')
+
+    def get_file(self, obj):
+        if obj.status != Job.DONE or not (obj.result or {}).get('file'):
+            return None
+        if obj.finished_at < timezone.now() - timedelta(
+            seconds=settings.EXPORTS_RETENTION
+        ):
+            return None
+        return self.context['request'].build_absolute_uri(
+            default_storage.url(obj.result['file'])
+        )
+
+
 class RecipeInfoSerializer(serializers.ModelSerializer):
     """Сериализатор краткой информации рецепта."""
 
@@ -269,20 +396,35 @@ class FollowSerializer(UsersSerializer):
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
 
+    collapsed_fields = {
+        'recipes': lambda: serializers.SerializerMethodField(
+            method_name='get_recipe_ids'
+        ),
+    }
+
     class Meta(UsersSerializer.Meta):
         fields = UsersSerializer.Meta.fields + ('recipes', 'recipes_count',)
         read_only_fields = ('email', 'username', 'last_name', 'first_name',)
 
-    def get_recipes(self, obj):
+    def get_author_recipes(self, obj):
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
         recipes = Recipe.objects.filter(author=obj)
         if limit:
             recipes = recipes[:int(limit)]
-        serializer = RecipeInfoSerializer(recipes,
+        return recipes
+
+    def get_recipes(self, obj):
+        serializer = RecipeInfoSerializer(self.get_author_recipes(obj),
                                           many=True,
                                           read_only=True)
         return serializer.data
 
+    def get_recipe_ids(self, obj):
+        return list(self.get_author_recipes(obj).values_list('id',
+                                                             flat=True))
+
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj).count()
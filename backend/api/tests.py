@@ -0,0 +1,121 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.lean_serializers import (LeanIngredientSerializer,
+                                  LeanRecipeSerializer, LeanTagSerializer)
+from api.renderers import FastJSONRenderer
+from api.serializers import (IngredientSerializer, RecipeSerializer,
+                             TagSerializer)
+from api.views import RecipeViewSet
+from app.models import Favorite, Follow, ShoppingCart
+from ingredient.models import Ingredient
+from recipe.models import IngredientRecipe, Recipe, Tag
+from recipe.services import refresh_summaries
+from users.models import User
+
+
+def render(data):
+    return FastJSONRenderer().render(data)
+
+
+class LeanSerializerTests(TestCase):
+    """Облегчённые сериализаторы отдают тот же JSON, что и DRF."""
+
+    fieldsets = (
+        {},
+        {'fields': 'id,name,is_favorited,is_in_shopping_cart'},
+        {'expand': ''},
+        {'expand': 'author'},
+        {'fields': 'tags,author,ingredients', 'expand': 'tags'},
+        {'fields': 'image,image_renditions,ingredients_summary'},
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Иван', last_name='Иванов', password='pass12345!',
+        )
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Пётр', last_name='Петров', password='pass12345!',
+        )
+        breakfast = Tag.objects.create(name='Завтрак', color='#FFAA00',
+                                       slug='breakfast')
+        lunch = Tag.objects.create(name='Обед', color='#00AAFF',
+                                   slug='lunch')
+        sugar = Ingredient.objects.create(name='сахар',
+                                          measurement_unit='г')
+        milk = Ingredient.objects.create(name='молоко',
+                                         measurement_unit='мл')
+        pancakes = Recipe.objects.create(
+            author=cls.author, name='Блины', text='Смешать и испечь.',
+            cooking_time=30, image='media/pancakes.png',
+            image_renditions={'320': 'media/renditions/1/320.jpg'},
+        )
+        pancakes.tags.add(breakfast, lunch)
+        porridge = Recipe.objects.create(
+            author=cls.reader, name='Каша', text='Сварить.',
+            cooking_time=15, image='media/porridge.png',
+        )
+        porridge.tags.add(breakfast)
+        IngredientRecipe.objects.bulk_create([
+            IngredientRecipe(recipe=pancakes, ingredient=sugar, amount=50),
+            IngredientRecipe(recipe=pancakes, ingredient=milk, amount=500),
+            IngredientRecipe(recipe=porridge, ingredient=milk, amount=200),
+        ])
+        refresh_summaries([pancakes.id, porridge.id])
+        Favorite.objects.create(user=cls.reader, recipe=pancakes)
+        ShoppingCart.objects.create(user=cls.reader, recipe=porridge)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def serialize(self, user, params):
+        """JSON списка рецептов от обоих сериализаторов для запроса."""
+        request = Request(APIRequestFactory().get('/api/recipes/', params))
+        request.user = user
+        view = RecipeViewSet(request=request, action='list',
+                             format_kwarg=None, kwargs={})
+        recipes = list(view.get_queryset().order_by('id'))
+        context = view.get_serializer_context()
+        fieldset = view.get_fieldset()
+        full = RecipeSerializer(recipes, many=True, context=context,
+                                **fieldset).data
+        lean = LeanRecipeSerializer(context, **fieldset).many(recipes)
+        return render(full), render(lean)
+
+    def test_recipes_same_output(self):
+        for user in (AnonymousUser(), self.reader):
+            for params in self.fieldsets:
+                with self.subTest(user=str(user), params=params):
+                    full, lean = self.serialize(user, params)
+                    self.assertEqual(len(json.loads(full)), 2)
+                    self.assertEqual(lean, full)
+
+    def test_user_flags(self):
+        full, lean = self.serialize(self.reader, {})
+        self.assertEqual(lean, full)
+        pancakes, porridge = json.loads(lean)
+        self.assertTrue(pancakes['is_favorited'])
+        self.assertFalse(pancakes['is_in_shopping_cart'])
+        self.assertTrue(pancakes['author']['is_subscribed'])
+        self.assertFalse(porridge['is_favorited'])
+        self.assertTrue(porridge['is_in_shopping_cart'])
+        self.assertFalse(porridge['author']['is_subscribed'])
+
+    def test_tags_same_output(self):
+        tags = Tag.objects.all()
+        self.assertEqual(
+            render(LeanTagSerializer().many(tags)),
+            render(TagSerializer(tags, many=True).data),
+        )
+
+    def test_ingredients_same_output(self):
+        ingredients = Ingredient.objects.all()
+        self.assertEqual(
+            render(LeanIngredientSerializer().many(ingredients)),
+            render(IngredientSerializer(ingredients, many=True).data),
+        )
@@ -0,0 +1,68 @@
+import time
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class ScopedTokenBucketThrottle(SimpleRateThrottle):
+    """Ограничение частоты запросов по алгоритму token bucket.
+
+    Область задаётся атрибутом throttle_scope представления, например
+    через @action(throttle_scope=...). На каждую пару (область,
+    пользователь) заводится ведро на num_requests токенов, которое
+    равномерно наполняется за duration секунд. Состояние ведра хранится
+    в общем кэше Django; чтение и запись ведра выполняются под
+    блокировкой из cache.add, атомарного в Memcached и Redis, поэтому
+    одновременные запросы не расходуют один и тот же токен.
+    """
+
+    scope_attr = 'throttle_scope'
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+    lock_timeout = 2
+    lock_attempts = 20
+    lock_delay = 0.005
+
+    def __init__(self):
+        # Область известна только после получения представления.
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.num_requests is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        lock = f'{self.key}:lock'
+        for _ in range(self.lock_attempts):
+            if self.cache.add(lock, True, self.lock_timeout):
+                try:
+                    return self.take_token()
+                finally:
+                    self.cache.delete(lock)
+            time.sleep(self.lock_delay)
+        # Ведро занято параллельными запросами того же пользователя.
+        self.wait_seconds = self.duration / self.num_requests
+        return False
+
+    def take_token(self):
+        refill = self.num_requests / self.duration
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(self.num_requests, tokens + (now - updated) * refill)
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / refill
+            return False
+        self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def wait(self):
+        return self.wait_seconds
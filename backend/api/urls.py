@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -11,7 +12,13 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 
+router_urls = router.urls
+if settings.SERVER_MODE == 'asgi':
+    from api.async_views import async_urlpatterns
+
+    router_urls = async_urlpatterns(router_urls)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls.authtoken'))
 ]
@@ -1,4 +1,6 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db.models import (Count, Exists, F, OuterRef, Prefetch, Q,
+                              Subquery, Value)
 from django.http.response import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
@@ -9,28 +11,114 @@ from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from api import metrics
+from api.coalescing import CoalescedListMixin
+from api.conditional import ConditionalRetrieveMixin
+from api.fieldsets import SparseFieldsViewMixin
 from api.filters import IngredientFilter, RecipeFilter
+from api.lean_serializers import (LeanIngredientSerializer, LeanListMixin,
+                                  LeanRecipeSerializer, LeanTagSerializer)
+from api.multiget import MultiGetMixin
+from api.pagination import FeedPagination
 from api.permissions import IsAuthorOrReadOnly
-from api.serializers import (CreateRecipeSerializer, FollowSerializer,
-                             IngredientSerializer, RecipeSerializer,
-                             TagSerializer, UsersSerializer)
+from api.serializers import (BulkIdsSerializer, CreateRecipeSerializer,
+                             FollowSerializer, IngredientSerializer,
+                             JobSerializer, PantryRecipeSerializer,
+                             PantrySerializer, RecipeSerializer, TagSerializer,
+                             UsersSerializer)
+from app.deletion import delete_recipes, delete_users
 from app.models import Favorite, Follow, ShoppingCart
 from ingredient.models import Ingredient
-from recipe.models import IngredientRecipe, Recipe, Tag
+from jobs.models import Job
+from jobs.queue import enqueue
+from recipe import pantry, shopping, similarity
+from recipe.models import Recipe, Tag
+from recipe.tasks import EXPORT_SHOPPING_LIST
 from users.models import User
 
 
-class UsersViewSet(UserViewSet):
+def bulk_link(model, user, field, queryset, request, excluded=()):
+    """Пакетно создаёт связи пользователя с объектами из списка ids.
+
+    Возвращает статус по каждому идентификатору: created, exists,
+    not_found или invalid.
+    """
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = list(dict.fromkeys(serializer.validated_data['ids']))
+    found = set(queryset.filter(id__in=ids).values_list('id', flat=True))
+    found -= set(excluded)
+    existing = set(model.objects.filter(
+        user=user, **{f'{field}_id__in': found}
+    ).values_list(f'{field}_id', flat=True))
+    created = found - existing
+    model.objects.bulk_create(
+        [model(user=user, **{f'{field}_id': pk}) for pk in created],
+        ignore_conflicts=True,
+    )
+    results = []
+    for pk in ids:
+        if pk in created:
+            result = 'created'
+        elif pk in existing:
+            result = 'exists'
+        elif pk in excluded:
+            result = 'invalid'
+        else:
+            result = 'not_found'
+        results.append({'id': pk, 'status': result})
+    return Response({'results': results}), len(created)
+
+
+class UsersViewSet(SparseFieldsViewMixin, MultiGetMixin, UserViewSet):
     """Вьюсет для пользователей и подписок. """
 
     queryset = User.objects.all()
     serializer_class = UsersSerializer
     permission_classes = [AllowAny]
+    throttle_scope = None
+    sparse_actions = ('list', 'retrieve', 'subscriptions')
+    sparse_columns = {
+        'email': ('email',),
+        'username': ('username',),
+        'first_name': ('first_name',),
+        'last_name': ('last_name',),
+    }
+
+    def get_queryset(self):
+        user = self.request.user
+        if self.action == 'subscriptions':
+            queryset = User.objects.filter(following__user=user)
+            if self.field_wanted('is_subscribed'):
+                queryset = queryset.annotate(is_subscribed=Value(True))
+            if self.field_wanted('recipes_count'):
+                queryset = queryset.annotate(
+                    recipes_count=Count('recipe')
+                ).order_by(*User._meta.ordering)
+            return self.prune_columns(queryset)
+        queryset = super().get_queryset()
+        if (self.request.method != 'GET'
+                or self.action not in self.sparse_actions):
+            return queryset
+        if user.is_authenticated and self.field_wanted('is_subscribed'):
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        return self.prune_columns(queryset)
+
+    def get_serializer_class(self):
+        if self.action == 'subscriptions':
+            return FollowSerializer
+        return super().get_serializer_class()
+
+    def perform_destroy(self, instance):
+        delete_users([instance.pk])
 
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        throttle_scope='subscribe',
     )
     def subscribe(self, request, **kwargs):
         user = request.user
@@ -41,69 +129,172 @@ class UsersViewSet(UserViewSet):
                                           data=request.data,
                                           context={'request': request})
             serializer.is_valid(raise_exception=True)
-            Follow.objects.create(user=user, author=author)
+            if not Follow.objects.link(user=user, author=author):
+                return Response({'errors': 'Вы уже подписаны на автора.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            metrics.count_operation('subscribe', 'add')
             return Response(
                 serializer.data,
                 status=status.HTTP_201_CREATED
             )
         if request.method == 'DELETE':
             get_object_or_404(Follow, user=user, author=author).delete()
+            metrics.count_operation('subscribe', 'delete')
             return Response({'detail': 'Вы успешно отписались'},
                             status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['POST'],
+        url_path='subscribe',
+        permission_classes=[IsAuthenticated],
+        throttle_scope='subscribe',
+    )
+    def subscribe_bulk(self, request):
+        response, created = bulk_link(Follow, request.user, 'author',
+                                      User.objects, request,
+                                      excluded=(request.user.pk,))
+        metrics.count_operation('subscribe', 'add', created)
+        return response
+
     @action(detail=False,
             permission_classes=[IsAuthenticated]
             )
     def subscriptions(self, request):
-        serializer = FollowSerializer(
-            self.paginate_queryset(
-                User.objects.filter(following__user=request.user)
-            ),
+        serializer = self.get_serializer(
+            self.paginate_queryset(self.get_queryset()),
             many=True,
-            context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalRetrieveMixin, SparseFieldsViewMixin,
+                    MultiGetMixin, LeanListMixin, viewsets.ModelViewSet):
     """Вьюсет для рецептов."""
 
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
+    lean_serializer_class = LeanRecipeSerializer
     permission_classes = [IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    throttle_scope = None
+    sparse_actions = ('list', 'retrieve', 'feed')
+    sparse_columns = {
+        'author': ('author',),
+        'name': ('name',),
+        'image': ('image',),
+        'image_renditions': ('image', 'image_renditions'),
+        'text': ('text',),
+        'cooking_time': ('cooking_time',),
+        'ingredients_summary': ('ingredients_summary',),
+    }
 
     def get_queryset(self):
-        queryset = Recipe.objects.all()
+        queryset = self.prune_columns(Recipe.objects.all())
+        if self.field_expanded('tags'):
+            queryset = queryset.prefetch_related('tags')
+        elif self.field_wanted('tags'):
+            queryset = queryset.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('id'))
+            )
+        if self.field_expanded('ingredients'):
+            queryset = queryset.prefetch_related('recipe__ingredient')
+        elif self.field_wanted('ingredients'):
+            queryset = queryset.prefetch_related('recipe')
+        user = self.request.user
+        if not user.is_authenticated:
+            if self.field_expanded('author'):
+                queryset = queryset.select_related('author')
+            return queryset
+        queryset = queryset.annotate(**{
+            name: flag for name, flag in self.get_flag_annotations().items()
+            if self.field_wanted(name)
+        })
+        if self.field_expanded('author'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'author',
+                queryset=User.objects.annotate(is_subscribed=Exists(
+                    Follow.objects.filter(user=user, author=OuterRef('pk'))
+                )),
+            ))
         return queryset
 
+    def get_flag_annotations(self):
+        user = self.request.user
+        return {
+            'is_favorited': Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            'is_in_shopping_cart': Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        }
+
+    def get_state_annotations(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return {}
+        return {
+            **self.get_flag_annotations(),
+            'is_subscribed': Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author_id')
+            )),
+        }
+
+    def get_throttles(self):
+        if self.action in ('create', 'update', 'partial_update'):
+            self.throttle_scope = 'recipes_write'
+        return super().get_throttles()
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeSerializer
         return CreateRecipeSerializer
 
+    def perform_destroy(self, instance):
+        delete_recipes([instance.id])
+
+    def get_feed_queryset(self, limit):
+        """Рецепты авторов из подписок, не больше limit на автора."""
+        cutoff = Recipe.objects.filter(
+            author=OuterRef('author')
+        ).order_by('-pub_date').values('pub_date')[limit - 1:limit]
+        return self.get_queryset().filter(
+            author__following__user=self.request.user
+        ).annotate(author_cutoff=Subquery(cutoff)).filter(
+            Q(author_cutoff__isnull=True)
+            | Q(pub_date__gte=F('author_cutoff'))
+        )
+
     def recipe_add(self, model, request, pk):
-        user = request.user
         recipe = get_object_or_404(Recipe, pk=pk)
-        serializer = RecipeSerializer(recipe)
-        if not model.objects.filter(recipe=recipe, user=user).exists():
-            model.objects.create(recipe=recipe, user=request.user)
+        if model.objects.link(user=request.user, recipe=recipe):
+            metrics.count_operation(model._meta.model_name, 'add')
+            serializer = RecipeSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response({'errors': 'Рецепт уже добавлен.'},
                         status=status.HTTP_400_BAD_REQUEST)
 
+    def recipe_add_bulk(self, model, request):
+        response, created = bulk_link(model, request.user, 'recipe',
+                                      Recipe.objects, request)
+        metrics.count_operation(model._meta.model_name, 'add', created)
+        return response
+
     def recipe_delete(self, model, request, pk):
         user = request.user
         recipe = get_object_or_404(Recipe, pk=pk)
         get_object_or_404(model, user=user, recipe=recipe).delete()
+        metrics.count_operation(model._meta.model_name, 'delete')
         return Response({'detail': 'Рецепт удален.'},
                         status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        throttle_scope='favorite',
     )
     def favorite(self, request, pk):
         if request.method == 'POST':
@@ -113,54 +304,159 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        throttle_scope='shopping_cart',
     )
     def shopping_cart(self, request, pk=None):
         if request.method == 'POST':
             return self.recipe_add(ShoppingCart, request, pk)
         return self.recipe_delete(ShoppingCart, request, pk)
 
+    @action(
+        detail=False,
+        methods=['POST'],
+        url_path='favorite',
+        permission_classes=[IsAuthenticated],
+        throttle_scope='favorite',
+    )
+    def favorite_bulk(self, request):
+        return self.recipe_add_bulk(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=['POST'],
+        url_path='shopping_cart',
+        permission_classes=[IsAuthenticated],
+        throttle_scope='shopping_cart',
+    )
+    def shopping_cart_bulk(self, request):
+        return self.recipe_add_bulk(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        limit = (request.query_params.get('recipes_limit')
+                 or str(settings.FEED_RECIPES_PER_AUTHOR))
+        if (not limit.isdigit()
+                or not 0 < int(limit) <= settings.FEED_RECIPES_MAX):
+            return Response(
+                {'errors': 'recipes_limit должен быть от 1 до '
+                           f'{settings.FEED_RECIPES_MAX}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = int(limit)
+        serializer = self.get_serializer(
+            self.paginate_queryset(self.get_feed_queryset(limit)),
+            many=True,
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True)
+    def similar(self, request, pk):
+        limit = request.query_params.get('limit', '10')
+        metric = request.query_params.get('metric', 'jaccard')
+        if (not limit.isdigit()
+                or not 0 < int(limit) <= settings.SIMILAR_RECIPES_MAX):
+            return Response(
+                {'errors': 'limit должен быть от 1 до '
+                           f'{settings.SIMILAR_RECIPES_MAX}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if metric not in similarity.METRICS:
+            return Response(
+                {'errors': 'metric должен быть одним из: '
+                           f'{", ".join(similarity.METRICS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        recipe = get_object_or_404(Recipe, pk=pk)
+        ranked = similarity.get_index().similar(recipe.id, int(limit),
+                                                metric)
+        recipes = self.get_queryset().in_bulk([pk for pk, _ in ranked])
+        serializer = RecipeSerializer(
+            [recipes[pk] for pk, _ in ranked if pk in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @action(detail=False)
+    def cook(self, request):
+        serializer = PantrySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        ranked = pantry.get_index().search(
+            serializer.validated_data['ingredients'],
+            serializer.validated_data['limit'],
+        )
+        recipes = self.get_queryset().in_bulk(
+            [pk for pk, _, _ in ranked]
+        )
+        result = []
+        for pk, coverage, matched in ranked:
+            if pk in recipes:
+                recipe = recipes[pk]
+                recipe.coverage = round(coverage, 4)
+                recipe.matched = matched
+                result.append(recipe)
+        serializer = PantryRecipeSerializer(
+            result, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
     @action(
         detail=False,
         methods=['GET'],
         permission_classes=[IsAuthenticated]
     )
     def download_shopping_cart(self, request):
-        user = request.user
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__shopping_cart__user=user).values(
-            'ingredient__name',
-            'ingredient__measurement_unit').annotate(
-            amount=Sum('amount')
-        )
-        data = []
-        for ingredient in ingredients:
-            data.append(
-                f'{ingredient["ingredient__name"]} - '
-                f'{ingredient["amount"]} '
-                f'{ingredient["ingredient__measurement_unit"]}'
-            )
-        content = 'Список покупок:\n\n' + '\n'.join(data)
+        content = shopping.render_shopping_list(request.user)
         filename = 'shopping_cart.txt'
         request = HttpResponse(content, content_type='text/plain')
         request['Content-Disposition'] = f'attachment; filename={filename}'
         return request
 
+    @action(
+        detail=False,
+        methods=['POST'],
+        permission_classes=[IsAuthenticated],
+        throttle_scope='exports',
+    )
+    def export_shopping_cart(self, request):
+        job = enqueue(EXPORT_SHOPPING_LIST, {'user_id': request.user.id})
+        serializer = JobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(
+        detail=False,
+        url_path=r'export_shopping_cart/(?P<job_id>\d+)',
+        permission_classes=[IsAuthenticated],
+    )
+    def export_shopping_cart_status(self, request, job_id):
+        job = get_object_or_404(Job, pk=job_id, name=EXPORT_SHOPPING_LIST,
+                                payload__user_id=request.user.id)
+        serializer = JobSerializer(job, context={'request': request})
+        return Response(serializer.data)
+
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CoalescedListMixin, LeanListMixin, viewsets.ModelViewSet):
     """Вьюсет для тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    lean_serializer_class = LeanTagSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, )
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(CoalescedListMixin, LeanListMixin,
+                        viewsets.ModelViewSet):
     """Вьюсет для ингредиентов."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    lean_serializer_class = LeanIngredientSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, )
     pagination_class = None
     filter_backends = (IngredientFilter, )
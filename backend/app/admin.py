@@ -1,19 +1,77 @@
-from django.contrib import admin
+from collections import Counter
 
+from django.apps import apps
+from django.contrib import admin, messages
+
+from app.deletion import dependents
 from app.models import Favorite, Follow, ShoppingCart
 
 
+class ChunkedDeleteAdminMixin:
+    """Удаление объектов сервисом app.deletion вместо каскада Django.
+
+    Удаление идёт короткими транзакциями, поэтому delete_view не
+    оборачивается в общую транзакцию, а страница подтверждения
+    показывает число зависимых записей вместо их списка.
+    """
+
+    deletion = None
+
+    def delete_view(self, request, object_id, extra_context=None):
+        return self._delete_view(request, object_id, extra_context)
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        counts = Counter({self.model: len(objs)})
+        for queryset in dependents(self.model, [obj.pk for obj in objs]):
+            counts[queryset.model] += queryset.count()
+        model_count, perms_needed = {}, set()
+        for model, count in counts.items():
+            if not count or model._meta.auto_created:
+                continue
+            model_count[model._meta.verbose_name_plural] = count
+            model_admin = self.admin_site._registry.get(model)
+            if (model_admin is not None
+                    and not model_admin.has_delete_permission(request)):
+                perms_needed.add(model._meta.verbose_name)
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+    def report_deleted(self, request, deleted):
+        models = {label: apps.get_model(label) for label in deleted}
+        summary = ', '.join(
+            f'{model._meta.verbose_name_plural}: {deleted[label]}'
+            for label, model in models.items()
+            if not model._meta.auto_created
+        )
+        self.message_user(request, f'Удалено записей — {summary}.',
+                          messages.INFO)
+
+    def delete_model(self, request, obj):
+        self.report_deleted(request, self.deletion([obj.pk]))
+
+    def delete_queryset(self, request, queryset):
+        self.report_deleted(
+            request, self.deletion(queryset.values_list('pk', flat=True))
+        )
+
+
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe', )
-    search_fields = ('user', 'recipe', )
+    list_select_related = ('user', 'recipe__author', )
+    search_fields = ('user__username', 'recipe__name', )
+    autocomplete_fields = ('user', 'recipe', )
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe', )
-    search_fields = ('user', 'recipe', )
+    list_select_related = ('user', 'recipe__author', )
+    search_fields = ('user__username', 'recipe__name', )
+    autocomplete_fields = ('user', 'recipe', )
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
@@ -21,5 +79,8 @@ class ShoppingCartAdmin(admin.ModelAdmin):
 class FollowAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'user', 'author',)
-    list_editable = ('user', 'author')
+    list_select_related = ('user', 'author', )
+    search_fields = ('user__username', 'author__username', )
+    autocomplete_fields = ('user', 'author', )
+    show_full_result_count = False
     empty_value_display = '-пусто-'
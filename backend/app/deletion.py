@@ -0,0 +1,161 @@
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from app.models import Favorite, Follow, ShoppingCart
+from jobs.queue import enqueue
+from recipe.models import IngredientRecipe, Recipe
+from recipe.services import recipes_changed
+from recipe.tasks import DELETE_FILES
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+def recipe_dependents(recipe_ids):
+    """Записи, которые ссылаются на рецепты и удаляются вместе с ними."""
+    return [
+        IngredientRecipe.objects.filter(recipe_id__in=recipe_ids),
+        Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids),
+        Favorite.objects.filter(recipe_id__in=recipe_ids),
+        ShoppingCart.objects.filter(recipe_id__in=recipe_ids),
+    ]
+
+
+def user_relations(user_ids):
+    """Связи пользователей с рецептами и авторами."""
+    return [
+        Favorite.objects.filter(user_id__in=user_ids),
+        ShoppingCart.objects.filter(user_id__in=user_ids),
+        Follow.objects.filter(user_id__in=user_ids),
+        Follow.objects.filter(author_id__in=user_ids),
+    ]
+
+
+def dependents(model, ids):
+    """Все удаляемые вместе с объектами записи для подтверждения."""
+    if model is Recipe:
+        return recipe_dependents(ids)
+    recipes = Recipe.objects.filter(author_id__in=ids)
+    return [*user_relations(ids), *recipe_dependents(recipes.values('pk')),
+            recipes]
+
+
+def delete_chunk(queryset, limit=None):
+    """Удаляет до limit строк queryset одним DELETE без загрузки объектов.
+
+    Строки выбираются подзапросом DELETE ... WHERE id IN (SELECT ...
+    LIMIT n); сигналы и каскады Django не выполняются.
+    """
+    model = queryset.model
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    queryset = queryset.order_by().values('pk')
+    if limit is not None:
+        queryset = queryset[:limit]
+    subquery, params = queryset.query.get_compiler(using=using).as_sql()
+    sql = (f'DELETE FROM {quote(model._meta.db_table)} '
+           f'WHERE {quote(model._meta.pk.column)} IN ({subquery})')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+class ChunkedDeletion:
+    """Удаление пользователей и рецептов пакетами в коротких транзакциях.
+
+    Вместо сборки каскада в памяти зависимые записи удаляются пакетами
+    по chunk_size строк, каждый пакет в своей транзакции. Файлы фото
+    удаляет фоновая задача после фиксации удаления рецептов. progress
+    вызывается после каждого пакета с меткой модели и числом удалённых
+    к этому моменту записей этой модели.
+    """
+
+    def __init__(self, chunk_size=None, progress=None):
+        self.chunk_size = chunk_size or settings.DELETION_CHUNK_SIZE
+        self.progress = progress
+        self.deleted = Counter()
+
+    def count(self, label, deleted):
+        if not deleted:
+            return
+        self.deleted[label] += deleted
+        logger.info('%s: удалено %s', label, self.deleted[label])
+        if self.progress is not None:
+            self.progress(label, self.deleted[label])
+
+    def delete_in_chunks(self, queryset):
+        using = router.db_for_write(queryset.model)
+        while True:
+            with transaction.atomic(using=using):
+                deleted = delete_chunk(queryset, self.chunk_size)
+            self.count(queryset.model._meta.label, deleted)
+            if deleted < self.chunk_size:
+                return
+
+    def delete_recipes(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        using = router.db_for_write(Recipe)
+        for start in range(0, len(recipe_ids), self.chunk_size):
+            batch = recipe_ids[start:start + self.chunk_size]
+            for queryset in recipe_dependents(batch):
+                self.delete_in_chunks(queryset)
+            with transaction.atomic(using=using):
+                # Блокировка строк рецептов заставляет параллельные
+                # вставки связей ждать удаления и завершаться ошибкой
+                # у себя, поэтому зачистка ниже находит все связи.
+                locked = Recipe.objects.select_for_update().filter(
+                    pk__in=batch
+                ).values_list('image', 'image_renditions')
+                files = []
+                for image, renditions in locked:
+                    files.extend(filter(None, (image, *renditions.values())))
+                # Связи, добавленные после удаления пакетов выше.
+                for queryset in recipe_dependents(batch):
+                    self.count(queryset.model._meta.label,
+                               delete_chunk(queryset))
+                self.count(Recipe._meta.label,
+                           delete_chunk(Recipe.objects.filter(pk__in=batch)))
+                if files:
+                    enqueue(DELETE_FILES, {'names': files})
+                transaction.on_commit(
+                    lambda batch=batch: recipes_changed(batch)
+                )
+
+    def delete_users(self, user_ids):
+        user_ids = list(user_ids)
+        for queryset in user_relations(user_ids):
+            self.delete_in_chunks(queryset)
+        recipes = Recipe.objects.filter(author_id__in=user_ids).values_list(
+            'pk', flat=True
+        )
+        while True:
+            recipe_ids = list(recipes[:self.chunk_size])
+            if not recipe_ids:
+                break
+            self.delete_recipes(recipe_ids)
+        for user_id in user_ids:
+            with transaction.atomic(using=router.db_for_write(User)):
+                _, deleted = User.objects.filter(pk=user_id).delete()
+            for label, count in deleted.items():
+                self.count(label, count)
+
+
+def delete_recipes(recipe_ids, chunk_size=None, progress=None):
+    """Удаляет рецепты; возвращает число удалённых записей по моделям."""
+    deletion = ChunkedDeletion(chunk_size, progress)
+    deletion.delete_recipes(recipe_ids)
+    return deletion.deleted
+
+
+def delete_users(user_ids, chunk_size=None, progress=None):
+    """Удаляет пользователей с их рецептами и связями.
+
+    Возвращает число удалённых записей по моделям.
+    """
+    deletion = ChunkedDeletion(chunk_size, progress)
+    deletion.delete_users(user_ids)
+    return deletion.deleted
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from recipe.similarity import build_arrays, save_arrays
+
+
+class Command(BaseCommand):
+    help = ('Сборка матрицы ингредиентов рецептов для поиска похожих '
+            'рецептов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory',
+                            help='Каталог индекса вместо '
+                                 'SIMILARITY_INDEX_DIR')
+
+    def handle(self, *args, **options):
+        arrays, position = build_arrays()
+        version = save_arrays(arrays, position, options['directory'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс {version}: {len(arrays["recipe_ids"])} рецептов, '
+            f'{len(arrays["ingredient_ids"])} ингредиентов'
+        ))
@@ -0,0 +1,125 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+from django.http import HttpRequest
+from rest_framework.request import Request
+
+from api.views import RecipeViewSet
+from app.models import Favorite, ShoppingCart
+from ingredient.models import Ingredient
+from recipe.models import IngredientRecipe, Recipe, Tag
+from users.models import User
+
+SCAN_PATTERN = re.compile(
+    r'Seq Scan on (\w+)|\bSCAN (?:TABLE )?(\w+)(?: AS \w+)?$'
+)
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN ANALYZE основных запросов API и поиск '
+            'последовательного сканирования больших таблиц')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold', type=int, default=1000,
+            help='Число строк, начиная с которого Seq Scan считается '
+                 'проблемой',
+        )
+        parser.add_argument('--user', type=int,
+                            help='id пользователя для запросов с его '
+                                 'данными')
+        parser.add_argument('--plans', action='store_true',
+                            help='Выводить планы целиком')
+
+    def handle(self, *args, **options):
+        user = (User.objects.filter(pk=options['user']).first()
+                if options['user'] else User.objects.first())
+        if user is None:
+            raise CommandError('В базе нет пользователей')
+        row_counts = {}
+        flagged = 0
+        for name, queryset in self.get_queries(user):
+            connection = connections[router.db_for_read(queryset.model)]
+            if connection.vendor == 'postgresql':
+                plan = queryset.explain(analyze=True)
+            else:
+                plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            if options['plans']:
+                self.stdout.write(plan)
+            for table in self.scanned_tables(plan):
+                if table not in row_counts:
+                    row_counts[table] = self.count_rows(connection, table)
+                if row_counts[table] >= options['threshold']:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'  Seq Scan по {table}: {row_counts[table]} строк'
+                    ))
+        if flagged:
+            self.stdout.write(self.style.WARNING(
+                f'Найдено последовательных сканирований: {flagged}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                'Последовательных сканирований больших таблиц нет'
+            ))
+
+    def get_queries(self, user):
+        """Запросы, которые выполняют действия вьюсетов."""
+        request = Request(HttpRequest())
+        request.user = user
+        view = RecipeViewSet(request=request, format_kwarg=None)
+        recipes = view.get_queryset()
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        tag = Tag.objects.first()
+        recipe = Recipe.objects.first()
+        queries = [
+            ('recipes.list', recipes[:page_size]),
+            ('recipes.list?author',
+             recipes.filter(author=user)[:page_size]),
+            ('recipes.list?is_favorited',
+             recipes.filter(favoriting__user=user)[:page_size]),
+            ('recipes.list?is_in_shopping_cart',
+             recipes.filter(shopping_cart__user=user)[:page_size]),
+            ('recipes.feed', view.get_feed_queryset(
+                settings.FEED_RECIPES_PER_AUTHOR
+            )[:page_size]),
+            ('recipes.download_shopping_cart',
+             IngredientRecipe.objects.filter(
+                 recipe_id__in=ShoppingCart.objects.filter(
+                     user=user
+                 ).values('recipe_id')
+             ).values_list(
+                 'recipe_id', 'ingredient__name',
+                 'ingredient__measurement_unit', 'amount',
+             )),
+            ('users.subscriptions', User.objects.filter(
+                following__user=user
+            )[:page_size]),
+            ('ingredients.list?name',
+             Ingredient.objects.filter(name__istartswith='а')),
+            ('tags.list', Tag.objects.all()),
+        ]
+        if tag is not None:
+            queries.append(('recipes.list?tags', recipes.filter(
+                tags__slug=tag.slug
+            )[:page_size]))
+        if recipe is not None:
+            queries.append(('admin.recipe.in_favorites',
+                            Favorite.objects.filter(recipe=recipe)))
+        return queries
+
+    def scanned_tables(self, plan):
+        for line in plan.splitlines():
+            match = SCAN_PATTERN.search(line.strip())
+            if match:
+                yield match.group(1) or match.group(2)
+
+    def count_rows(self, connection, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+            )
+            return cursor.fetchone()[0]
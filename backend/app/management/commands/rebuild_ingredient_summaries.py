@@ -0,0 +1,38 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+
+from recipe.models import IngredientRecipe, Recipe
+from recipe.services import summarize_ingredients
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт сводок ингредиентов рецептов'
+
+    def handle(self, *args, **kwargs):
+        rows = IngredientRecipe.objects.order_by('recipe_id').values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__measurement_unit',
+            'amount',
+        ).iterator()
+        batch = []
+        updated = 0
+        for recipe_id, items in groupby(rows, key=lambda row: row[0]):
+            summary = summarize_ingredients(item[1:] for item in items)
+            batch.append(Recipe(id=recipe_id,
+                                ingredients_summary=summary,
+                                ingredients_hash=summary['hash']))
+            if len(batch) == BATCH_SIZE:
+                updated += self.save(batch)
+                batch = []
+        updated += self.save(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Сводки пересчитаны для {updated} рецептов'
+        ))
+
+    def save(self, batch):
+        Recipe.objects.bulk_update(
+            batch, ['ingredients_summary', 'ingredients_hash']
+        )
+        return len(batch)
@@ -1,11 +1,36 @@
 
-from django.db import models
+from django.db import connections, models, router
 from django.db.models.constraints import UniqueConstraint
 
 from recipe.models import Recipe
 from users.models import User
 
 
+class UserRelationQuerySet(models.QuerySet):
+    """Связи пользователя с рецептами и авторами."""
+
+    def link(self, **fields):
+        """Создаёт связь одним INSERT ... ON CONFLICT DO NOTHING.
+
+        Возвращает True, если запись добавлена, и False, если она уже была.
+        """
+        meta = self.model._meta
+        connection = connections[router.db_for_write(self.model)]
+        quote = connection.ops.quote_name
+        columns, values = [], []
+        for name, value in fields.items():
+            columns.append(quote(meta.get_field(name).column))
+            values.append(getattr(value, 'pk', value))
+        sql = (
+            f'INSERT INTO {quote(meta.db_table)} ({", ".join(columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(values))}) '
+            f'ON CONFLICT DO NOTHING RETURNING {quote(meta.pk.column)}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            return cursor.fetchone() is not None
+
+
 class Favorite(models.Model):
     """Модель для избранных рецептов."""
 
@@ -20,8 +45,11 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Избранные рецепты',
         related_name='favoriting',
+        db_index=False,
     )
 
+    objects = UserRelationQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
@@ -31,6 +59,12 @@ class Favorite(models.Model):
                 name='unique_favorite',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='favorite_recipe_user_idx',
+            ),
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -47,8 +81,11 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепт в корзине',
         related_name='shopping_cart',
+        db_index=False,
     )
 
+    objects = UserRelationQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
@@ -58,6 +95,12 @@ class ShoppingCart(models.Model):
                 name='unique_shopping_cart'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='shopping_cart_recipe_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username} - {self.recipe.name}'
@@ -76,9 +119,12 @@ class Follow(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='following',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False,
     )
 
+    objects = UserRelationQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
@@ -88,6 +134,12 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username} - {self.author.username}'
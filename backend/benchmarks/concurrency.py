@@ -0,0 +1,73 @@
+"""Сравнение пропускной способности WSGI и ASGI при одинаковом числе воркеров.
+
+Запустите оба сервера на одной базе с одинаковым числом воркеров:
+
+    SERVER_MODE=wsgi gunicorn foodgram.wsgi:application -w 4 -b :8001
+    SERVER_MODE=asgi gunicorn foodgram.asgi:application -w 4 -b :8002
+
+и выполните:
+
+    python benchmarks/concurrency.py http://localhost:8001 \\
+        http://localhost:8002 --concurrency 64 --requests 2000
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/tags/',
+    '/api/ingredients/?name=%D0%BC',
+)
+
+
+def fetch(session, url):
+    started = time.perf_counter()
+    response = session.get(url)
+    return time.perf_counter() - started, response.status_code
+
+
+def run(base_url, concurrency, total, token):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if token:
+        session.headers['Authorization'] = f'Token {token}'
+    urls = [base_url + PATHS[i % len(PATHS)] for i in range(total)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda url: fetch(session, url), urls))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(duration for duration, _ in results)
+    errors = sum(1 for _, status in results if status >= 400)
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('wsgi_url')
+    parser.add_argument('asgi_url')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--token', help='Токен для авторизованных запросов')
+    args = parser.parse_args()
+    for name, url in (('wsgi', args.wsgi_url), ('asgi', args.asgi_url)):
+        run(url, args.concurrency, len(PATHS) * 2, args.token)
+        result = run(url, args.concurrency, args.requests, args.token)
+        print(f'{name}: {result["rps"]:.1f} req/s, '
+              f'p50 {result["p50"]:.1f} ms, p95 {result["p95"]:.1f} ms, '
+              f'ошибок {result["errors"]}')
+
+
+if __name__ == '__main__':
+    main()
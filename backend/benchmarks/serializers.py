@@ -0,0 +1,117 @@
+"""Сверка облегчённых сериализаторов с DRF и замер CPU на страницу.
+
+Запускается из каталога backend на базе с данными:
+
+    python benchmarks/serializers.py --pages 5 --repeat 50 --user 1
+
+Для каждой страницы рецептов, тегов и ингредиентов сравнивает
+JSON облегчённого сериализатора с JSON ModelSerializer байт в байт
+и выводит процессорное время на одну страницу. При расхождении
+завершается с кодом 1.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__
+))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+
+CARD_FIELDSET = {
+    'fields': ('id', 'tags', 'name', 'image', 'cooking_time',
+               'is_favorited', 'is_in_shopping_cart'),
+    'expand': (),
+}
+
+
+def cpu_per_call(func, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - started) / repeat * 1000
+
+
+def cases(user, pages):
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+
+    from api.lean_serializers import (LeanIngredientSerializer,
+                                      LeanRecipeSerializer, LeanTagSerializer)
+    from api.serializers import (IngredientSerializer, RecipeSerializer,
+                                 TagSerializer)
+    from api.views import RecipeViewSet
+    from ingredient.models import Ingredient
+    from recipe.models import Tag
+
+    for current_user in (AnonymousUser(), user):
+        if current_user is None:
+            continue
+        request = Request(RequestFactory().get('/api/recipes/'))
+        request.user = current_user
+        context = {'request': request}
+        view = RecipeViewSet(request=request, format_kwarg=None)
+        queryset = view.get_queryset()
+        page_size = view.paginator.page_size
+        for number in range(pages):
+            page = list(queryset[number * page_size:
+                                 (number + 1) * page_size])
+            if not page:
+                break
+            yield (f'recipes page {number + 1} ({current_user})',
+                   lambda page=page, context=context: RecipeSerializer(
+                       page, many=True, context=context
+                   ).data,
+                   lambda page=page, context=context: LeanRecipeSerializer(
+                       context
+                   ).many(page))
+            yield (f'recipe cards page {number + 1} ({current_user})',
+                   lambda page=page, context=context: RecipeSerializer(
+                       page, many=True, context=context, **CARD_FIELDSET
+                   ).data,
+                   lambda page=page, context=context: LeanRecipeSerializer(
+                       context, **CARD_FIELDSET
+                   ).many(page))
+    tags = list(Tag.objects.all())
+    yield ('tags', lambda: TagSerializer(tags, many=True).data,
+           lambda: LeanTagSerializer().many(tags))
+    ingredients = list(Ingredient.objects.all())
+    yield ('ingredients',
+           lambda: IngredientSerializer(ingredients, many=True).data,
+           lambda: LeanIngredientSerializer().many(ingredients))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--user', type=int,
+                        help='id пользователя для страниц с его флагами')
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from rest_framework.renderers import JSONRenderer
+
+    from users.models import User
+
+    user = User.objects.filter(pk=args.user).first() if args.user else None
+    renderer = JSONRenderer()
+    mismatches = 0
+    for name, drf, lean in cases(user, args.pages):
+        expected, actual = renderer.render(drf()), renderer.render(lean())
+        if expected != actual:
+            mismatches += 1
+            print(f'{name}: ответы различаются')
+            continue
+        drf_ms = cpu_per_call(drf, args.repeat)
+        lean_ms = cpu_per_call(lean, args.repeat)
+        print(f'{name}: DRF {drf_ms:.2f} мс, облегчённый {lean_ms:.2f} мс, '
+              f'x{drf_ms / lean_ms if lean_ms else float("inf"):.1f}')
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+from django.db.backends.postgresql import base
+
+from foodgram.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений внутри процесса.
+
+    Закрытие соединения в конце запроса возвращает его в пул.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        self.isolation_level = connection.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            self.pool.release(self.connection)
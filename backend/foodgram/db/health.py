@@ -0,0 +1,15 @@
+from django.db import connections
+
+
+def close_unusable_connections(**kwargs):
+    """Проверяет постоянные соединения перед обработкой запроса.
+
+    Повторяет CONN_HEALTH_CHECKS из Django 4.1 для более ранних версий:
+    соединение, разорванное сервером, закрывается до первого запроса.
+    """
+    for connection in connections.all():
+        if (connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and connection.connection is not None
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import extensions
+
+from api import metrics
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за отведённое время."""
+
+
+class ConnectionPool:
+    """Пул соединений psycopg2 для потоков одного процесса.
+
+    Держит не больше max_size соединений; простаивающие дольше
+    idle_timeout закрываются, пока их больше min_size.
+    """
+
+    def __init__(self, alias, min_size=1, max_size=10, idle_timeout=300,
+                 timeout=30, health_checks=True):
+        self.alias = alias
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.health_checks = health_checks
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, connect):
+        started = time.monotonic()
+        while True:
+            connection = self._take(started)
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    self._discard()
+                    raise
+                break
+            if self._is_usable(connection):
+                break
+            self._discard(connection)
+        metrics.DB_POOL_WAIT.labels(self.alias).observe(
+            time.monotonic() - started
+        )
+        self._report()
+        return connection
+
+    def release(self, connection):
+        if connection.closed or not self._reset(connection):
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+        self._report()
+
+    def _take(self, started):
+        with self._condition:
+            while True:
+                self._close_expired()
+                if self._idle:
+                    return self._idle.pop()[0]
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f'Нет свободных соединений с БД {self.alias!r} '
+                        f'за {self.timeout} с'
+                    )
+                self._condition.wait(remaining)
+
+    def _discard(self, connection=None):
+        if connection is not None and not connection.closed:
+            connection.close()
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        self._report()
+
+    def _close_expired(self):
+        deadline = time.monotonic() - self.idle_timeout
+        while (self._idle and self._size > self.min_size
+               and self._idle[0][1] < deadline):
+            connection, _ = self._idle.popleft()
+            connection.close()
+            self._size -= 1
+
+    def _is_usable(self, connection):
+        if connection.closed:
+            return False
+        if not self.health_checks:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def _reset(self, connection):
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        try:
+            connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def _report(self):
+        idle = len(self._idle)
+        metrics.DB_POOL_CONNECTIONS.labels(self.alias, 'idle').set(idle)
+        metrics.DB_POOL_CONNECTIONS.labels(self.alias, 'busy').set(
+            self._size - idle
+        )
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """Пул для псевдонима БД, свой в каждом процессе."""
+    key = (os.getpid(), alias)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    alias,
+                    health_checks=settings_dict.get('CONN_HEALTH_CHECKS',
+                                                    True),
+                    **settings_dict.get('POOL', {}),
+                )
+    return pool
@@ -0,0 +1,65 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject
+
+REPLICA_DB_ALIAS = 'replica'
+PRIMARY_ONLY_APPS = {'authtoken', 'jobs', 'sessions'}
+
+_read_request = ContextVar('read_request', default=None)
+
+
+def pin_key(user_id):
+    return f'db-primary:{user_id}'
+
+
+def pin_to_primary(user):
+    """Отправляет чтения пользователя в основную БД после его записи."""
+    cache.set(pin_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def route_reads_to_replica(request):
+    _read_request.set(request)
+
+
+def reset_routing():
+    _read_request.set(None)
+
+
+def is_pinned(request):
+    if hasattr(request, 'db_pinned'):
+        return request.db_pinned
+    user = vars(request).get('user')
+    if user is None or isinstance(user, SimpleLazyObject):
+        return False
+    request.db_pinned = (user.is_authenticated
+                         and cache.get(pin_key(user.pk), False))
+    return request.db_pinned
+
+
+class PrimaryReplicaRouter:
+    """Чтения безопасных запросов к вьюсетам идут на реплику.
+
+    Запись, транзакции, токены и чтения пользователя в течение
+    REPLICA_STICKY_SECONDS после его записи остаются в основной БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        request = _read_request.get()
+        if (request is None
+                or model._meta.app_label in PRIMARY_ONLY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block
+                or is_pinned(request)):
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -1,6 +1,8 @@
 import os
+import tempfile
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,16 +29,20 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'app.apps.AppConfig',
     'ingredient.apps.IngredientConfig',
+    'jobs.apps.JobsConfig',
     'recipe.apps.RecipeConfig',
     'users.apps.UsersConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -60,18 +66,69 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS',
+                                        'True') == 'True',
     }
 }
 
+if os.getenv('DB_POOL', False) == 'True':
+    DATABASES['default'].update({
+        'ENGINE': 'foodgram.db.backends.postgresql_pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'idle_timeout': int(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+            'timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        },
+    })
+
+if os.getenv('REPLICA_DB_HOST') or os.getenv('REPLICA_DB_NAME'):
+    DATABASES['replica'] = dict(
+        DATABASES['default'],
+        NAME=os.getenv('REPLICA_DB_NAME', DATABASES['default']['NAME']),
+        HOST=os.getenv('REPLICA_DB_HOST', DATABASES['default']['HOST']),
+        PORT=os.getenv('REPLICA_DB_PORT', DATABASES['default']['PORT']),
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_ROUTERS = ['foodgram.db.routers.PrimaryReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+if os.getenv('CACHE_BACKEND'):
+    CACHES = {
+        'default': {
+            'BACKEND': os.getenv('CACHE_BACKEND'),
+            'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'foodgram',
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        'Задайте CACHE_BACKEND и CACHE_LOCATION: версии пользователей, '
+        'счётчики ограничений и журнал изменений рецептов должны быть '
+        'общими для всех процессов (Memcached или Redis).'
+    )
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -108,18 +165,55 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MIN_COOK_TIME = 1
 MAX_COOK_TIME = 700
 
+BULK_MAX_SIZE = 100
+FEED_RECIPES_PER_AUTHOR = 10
+FEED_RECIPES_MAX = 50
+SIMILAR_RECIPES_MAX = 50
+PANTRY_MAX_INGREDIENTS = 30
+PANTRY_MAX_RESULTS = 50
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_CACHE_SIZE = 32
+JOBS_LOCK_TIMEOUT = int(os.getenv('JOBS_LOCK_TIMEOUT', 600))
+JOBS_RETRY_BASE = 10
+JOBS_RETRY_MAX = 60 * 60
+RECIPE_IMAGE_WIDTHS = (320, 640)
+EXPORTS_RETENTION = int(os.getenv('EXPORTS_RETENTION', 24 * 60 * 60))
+DELETION_CHUNK_SIZE = int(os.getenv('DELETION_CHUNK_SIZE', 500))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 300))
+AUTH_TOKEN_CACHE_SHARED = os.getenv('AUTH_TOKEN_CACHE_SHARED',
+                                    False) == 'True'
+SIMILARITY_INDEX_DIR = os.getenv(
+    'SIMILARITY_INDEX_DIR',
+    os.path.join(tempfile.gettempdir(), 'foodgram-similarity')
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageFieldPagination',
     'PAGE_SIZE': 6,
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.ScopedTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'subscribe': os.getenv('THROTTLE_RATE_SUBSCRIBE', '30/min'),
+        'favorite': os.getenv('THROTTLE_RATE_FAVORITE', '60/min'),
+        'shopping_cart': os.getenv('THROTTLE_RATE_SHOPPING_CART', '60/min'),
+        'recipes_write': os.getenv('THROTTLE_RATE_RECIPES_WRITE', '10/min'),
+        'exports': os.getenv('THROTTLE_RATE_EXPORTS', '10/min'),
+    },
 }
 
 DJOSER = {
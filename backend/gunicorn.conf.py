@@ -0,0 +1,25 @@
+import os
+import shutil
+
+METRICS_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                                    '/tmp/foodgram-metrics')
+
+if os.getenv('SERVER_MODE') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+
+
+def on_starting(server):
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR)
+
+
+def post_worker_init(worker):
+    from recipe.similarity import preload
+
+    preload()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
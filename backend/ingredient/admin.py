@@ -6,5 +6,5 @@ from .models import Ingredient
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit')
-    list_filter = ('name', )
+    list_filter = ('measurement_unit', )
     search_fields = ('name', )
@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at',
+                    'finished_at', )
+    list_filter = ('status', 'name', )
+    readonly_fields = ('locked_by', 'locked_at', 'result', 'error',
+                       'created', 'finished_at', )
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import shutil
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from prometheus_client import multiprocess, start_http_server
+
+from api.metrics import get_registry
+from jobs.worker import Worker
+
+
+def run_worker(options):
+    Worker(
+        threads=options['threads'],
+        batch=options['batch'],
+        poll_interval=options['poll_interval'],
+        once=options['once'],
+    ).run()
+
+
+class Command(BaseCommand):
+    help = 'Обработка очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Число процессов-обработчиков')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Число потоков в каждом процессе')
+        parser.add_argument('--batch', type=int, default=1,
+                            help='Сколько задач забирать за один запрос')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза в секундах, если очередь пуста')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и завершиться')
+        parser.add_argument('--metrics-port', type=int,
+                            default=int(os.getenv('WORKER_METRICS_PORT', 0)),
+                            help='Порт HTTP-сервера метрик Prometheus, '
+                                 '0 — не запускать')
+
+    def serve_metrics(self, port):
+        """Отдаёт метрики задач всех процессов-обработчиков.
+
+        Процессы пишут значения в PROMETHEUS_MULTIPROC_DIR; каталог
+        очищается при запуске, как это делает gunicorn для веб-сервера.
+        """
+        metrics_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+            os.makedirs(metrics_dir)
+        start_http_server(port, registry=get_registry())
+
+    def handle(self, *args, **options):
+        if options['metrics_port']:
+            self.serve_metrics(options['metrics_port'])
+        if options['processes'] == 1:
+            run_worker(options)
+            return
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=run_worker, args=(options,))
+            for _ in range(options['processes'])
+        ]
+        for child in children:
+            child.start()
+
+        def stop(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    os.kill(child.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for child in children:
+            child.join()
+            if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+                multiprocess.mark_process_dead(child.pid)
@@ -0,0 +1,86 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Модель фоновой задачи."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Задача',
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Параметры',
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки',
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5,
+        verbose_name='Максимум попыток',
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запуск не раньше',
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Обработчик',
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу',
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='Результат',
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана',
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена',
+    )
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='job_status_run_at_idx'),
+            models.Index(fields=['locked_by'], name='job_locked_by_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
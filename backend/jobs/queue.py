@@ -0,0 +1,106 @@
+import random
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api import metrics
+from jobs.models import Job
+from jobs.registry import get_task
+
+
+def enqueue(name, payload=None, delay=0):
+    """Ставит задачу в очередь.
+
+    Внутри транзакции задача станет видна обработчикам только после её
+    фиксации, вместе с данными, для которых она создана.
+    """
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        max_attempts=get_task(name).max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempt):
+    """Задержка перед повтором: экспоненциальная, со случайным разбросом."""
+    delay = min(settings.JOBS_RETRY_BASE * 2 ** (attempt - 1),
+                settings.JOBS_RETRY_MAX)
+    return delay * random.uniform(1, 1.5)
+
+
+def claim(worker_id, limit=1):
+    """Забирает до limit готовых к запуску задач.
+
+    Строки блокируются через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    обработчики не ждут друг друга. Условие повторяется в UPDATE: на
+    SQLite блокировки строк нет, и задачу получит только тот, чьё
+    обновление прошло первым. Задачи, зависшие в работе дольше
+    JOBS_LOCK_TIMEOUT, забираются повторно.
+    """
+    now = timezone.now()
+    claimable = (
+        Q(status=Job.PENDING, run_at__lte=now)
+        | Q(status=Job.RUNNING,
+            locked_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT))
+    )
+    token = f'{worker_id}:{uuid.uuid4().hex[:12]}'
+    with transaction.atomic():
+        ids = list(Job.objects.select_for_update(skip_locked=True).filter(
+            claimable
+        ).order_by('run_at').values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        Job.objects.filter(claimable, id__in=ids).update(
+            status=Job.RUNNING,
+            locked_by=token,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(locked_by=token))
+
+
+def finish(job, status, **fields):
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=status, locked_by='', locked_at=None, **fields
+    )
+
+
+def fail(job, error):
+    """Отмечает попытку неудачной: планирует повтор или завершает задачу."""
+    now = timezone.now()
+    fields = {'error': error}
+    if job.attempts >= job.max_attempts:
+        status = Job.FAILED
+        fields['finished_at'] = now
+    else:
+        status = Job.PENDING
+        fields['run_at'] = now + timedelta(seconds=backoff(job.attempts))
+    finish(job, status, **fields)
+    return status
+
+
+def execute(job):
+    """Выполняет взятую задачу и сохраняет результат или планирует повтор."""
+    started = time.perf_counter()
+    try:
+        result = get_task(job.name).func(**job.payload)
+    except Exception:
+        status = fail(job, traceback.format_exc())
+    else:
+        try:
+            finish(job, Job.DONE, result=result, error='',
+                   finished_at=timezone.now())
+            status = Job.DONE
+        except (TypeError, ValueError):
+            # Результат задачи не сохраняется в JSONField.
+            status = fail(job, traceback.format_exc())
+    outcome = 'retry' if status == Job.PENDING else status
+    metrics.observe_job(job.name, outcome, time.perf_counter() - started)
+    return status
@@ -0,0 +1,25 @@
+from collections import namedtuple
+
+Task = namedtuple('Task', ('name', 'func', 'max_attempts'))
+
+tasks = {}
+
+
+def task(name, max_attempts=5):
+    """Регистрирует функцию как фоновую задачу.
+
+    Параметры задачи передаются функции именованными аргументами, а её
+    результат должен сериализоваться в JSON.
+    """
+    def decorator(func):
+        tasks[name] = Task(name, func, max_attempts)
+        return func
+
+    return decorator
+
+
+def get_task(name):
+    try:
+        return tasks[name]
+    except KeyError:
+        raise LookupError(f'Задача {name} не зарегистрирована')
@@ -0,0 +1,62 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import traceback
+
+from django.db import close_old_connections, connections
+
+from jobs.queue import claim, execute, fail
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Обработчик очереди: несколько потоков в одном процессе."""
+
+    def __init__(self, threads=1, batch=1, poll_interval=1.0, once=False):
+        self.threads = threads
+        self.batch = batch
+        self.poll_interval = poll_interval
+        self.once = once
+        self.stop = threading.Event()
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: self.stop.set())
+        threads = [
+            threading.Thread(target=self.loop, args=(number,), daemon=True)
+            for number in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+
+    def loop(self, number):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}:{number}'
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    jobs = claim(worker_id, self.batch)
+                    if not jobs and self.once:
+                        break
+                    for job in jobs:
+                        try:
+                            execute(job)
+                        except Exception:
+                            logger.exception('Ошибка задачи %s в обработчике '
+                                             '%s', job.pk, worker_id)
+                            fail(job, traceback.format_exc())
+                except Exception:
+                    # Задача, не отмеченная выполненной, будет забрана
+                    # повторно после JOBS_LOCK_TIMEOUT.
+                    logger.exception('Ошибка в обработчике %s', worker_id)
+                    jobs = None
+                if not jobs:
+                    self.stop.wait(self.poll_interval)
+        finally:
+            connections.close_all()
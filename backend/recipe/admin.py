@@ -1,21 +1,39 @@
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
+from app.admin import ChunkedDeleteAdminMixin
+from app.deletion import delete_recipes
 from app.models import Favorite
+from recipe.services import schedule_refresh
 
 from .models import IngredientRecipe, Recipe, Tag
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(ChunkedDeleteAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'author', 'in_favorites', )
-    list_filter = ('name', 'author', 'tags', 'recipe',)
-    search_fields = ('name', )
+    list_filter = ('tags', )
+    list_select_related = ('author', )
+    search_fields = ('name', 'author__username', )
+    autocomplete_fields = ('author', )
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    deletion = staticmethod(delete_recipes)
+
+    def get_queryset(self, request):
+        favorites = Favorite.objects.filter(
+            recipe=OuterRef('pk')
+        ).values('recipe').annotate(count=Count('pk')).values('count')
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(Subquery(favorites), 0)
+        )
 
     def in_favorites(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
     in_favorites.short_description = 'Добавлен в избранное'
+    in_favorites.admin_order_field = 'favorites_count'
 
 
 @admin.register(Tag)
@@ -28,4 +46,21 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(IngredientRecipe)
 class IngredientRecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'amount')
-    list_editable = ('recipe', 'ingredient', 'amount')
+    list_editable = ('amount', )
+    list_select_related = ('recipe__author', 'ingredient')
+    search_fields = ('recipe__name', 'ingredient__name', )
+    autocomplete_fields = ('recipe', 'ingredient')
+    show_full_result_count = False
+
+    def delete_model(self, request, obj):
+        # У IngredientRecipe нет обработчика удаления, чтобы каскады
+        # удаляли строки без загрузки объектов.
+        super().delete_model(request, obj)
+        schedule_refresh([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.order_by().values_list(
+            'recipe_id', flat=True
+        ).distinct())
+        super().delete_queryset(request, queryset)
+        schedule_refresh(recipe_ids)
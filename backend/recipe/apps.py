@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 
 
 class RecipeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        from ingredient.models import Ingredient
+        from recipe.models import IngredientRecipe, Recipe, Tag
+        from recipe.services import (author_changed, ingredient_amount_changed,
+                                     ingredient_changed, recipe_tags_changed,
+                                     tag_changed)
+
+        m2m_changed.connect(recipe_tags_changed, sender=Recipe.tags.through)
+        post_save.connect(tag_changed, sender=Tag)
+        pre_delete.connect(tag_changed, sender=Tag)
+        post_save.connect(ingredient_changed, sender=Ingredient)
+        pre_delete.connect(ingredient_changed, sender=Ingredient)
+        post_save.connect(ingredient_amount_changed, sender=IngredientRecipe)
+        post_save.connect(author_changed, sender=settings.AUTH_USER_MODEL)
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+
+HEAD_KEY = 'recipe-changes:head'
+ENTRY_KEY = 'recipe-changes:{}'
+TIMEOUT = 60 * 60 * 24
+
+
+def position():
+    return cache.get(HEAD_KEY, 0)
+
+
+def publish(recipe_ids):
+    """Записывает изменённые рецепты в общий для процессов журнал."""
+    slot = position() + 1
+    while not cache.add(ENTRY_KEY.format(slot), list(recipe_ids), TIMEOUT):
+        slot += 1
+    if slot > position():
+        cache.set(HEAD_KEY, slot, TIMEOUT)
+
+
+def collect(since):
+    """Рецепты, изменённые после позиции журнала since.
+
+    Возвращает новую позицию и множество id рецептов. Вместо множества
+    возвращается None, если часть журнала уже вытеснена из кэша и
+    построенные по нему индексы нужно пересобрать целиком.
+    """
+    head = position()
+    if head == since:
+        return since, set()
+    if head < since:
+        return head, None
+    entries = cache.get_many(
+        [ENTRY_KEY.format(slot) for slot in range(since + 1, head + 1)]
+    )
+    if len(entries) < head - since:
+        return head, None
+    return head, set().union(*entries.values())
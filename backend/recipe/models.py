@@ -48,6 +48,7 @@ class Recipe(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Автор публикации',
         related_name='recipe',
+        db_index=False,
     )
     name = models.CharField(
         max_length=255,
@@ -63,6 +64,11 @@ class Recipe(models.Model):
         blank=True,
         verbose_name='Фото рецепта'
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Уменьшенные копии фото',
+    )
     text = models.TextField(
         max_length=2000,
         verbose_name='Текст рецепта',
@@ -84,11 +90,34 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
+    ingredients_summary = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Сводка по ингредиентам',
+    )
+    ingredients_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Хэш набора ингредиентов',
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx',
+            ),
+            models.Index(fields=['-pub_date'], name='recipe_pub_date_idx'),
+        ]
 
     def __str__(self):
         return f'{self.author}, {self.name}'
@@ -106,6 +135,7 @@ class IngredientRecipe(models.Model):
         Recipe,
         on_delete=models.CASCADE,
         related_name='recipe',
+        db_index=False,
     )
     amount = models.PositiveIntegerField(
         verbose_name='Количество ингридиентов',
@@ -126,3 +156,9 @@ class IngredientRecipe(models.Model):
                 name='unique_ingredient',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient'],
+                name='ingredient_recipe_recipe_idx',
+            ),
+        ]
@@ -0,0 +1,100 @@
+import heapq
+import threading
+import time
+from array import array
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS
+
+from recipe import changes
+from recipe.models import IngredientRecipe
+
+REFRESH_INTERVAL = 5
+
+
+class PantryIndex:
+    """Обратный индекс: ингредиент → рецепты, в которые он входит.
+
+    Списки рецептов хранятся в компактных массивах array и
+    обновляются по журналу изменений рецептов без полной перестройки.
+    """
+
+    def __init__(self, rows, position):
+        self.position = position
+        self.postings = {}
+        self.ingredients = {}
+        for recipe_id, ingredient_id in rows:
+            self.add(recipe_id, ingredient_id)
+        self.checked_at = time.monotonic()
+
+    @classmethod
+    def build(cls):
+        position = changes.position()
+        # Индекс обновляется по журналу, который опережает реплику.
+        return cls(IngredientRecipe.objects.using(DEFAULT_DB_ALIAS).order_by(
+            'ingredient_id', 'recipe_id'
+        ).values_list('recipe_id', 'ingredient_id').iterator(), position)
+
+    def add(self, recipe_id, ingredient_id):
+        self.postings.setdefault(ingredient_id, array('q')).append(recipe_id)
+        self.ingredients.setdefault(recipe_id, array('q')).append(
+            ingredient_id
+        )
+
+    def remove(self, recipe_id):
+        for ingredient_id in self.ingredients.pop(recipe_id, ()):
+            posting = self.postings[ingredient_id]
+            posting.remove(recipe_id)
+            if not posting:
+                del self.postings[ingredient_id]
+
+    def refresh(self):
+        """Применяет журнал изменений.
+
+        Возвращает False, если журнал потерян и индекс нужно перестроить.
+        """
+        if time.monotonic() - self.checked_at < REFRESH_INTERVAL:
+            return True
+        self.checked_at = time.monotonic()
+        position, changed = changes.collect(self.position)
+        if changed is None:
+            return False
+        if changed:
+            rows = IngredientRecipe.objects.using(DEFAULT_DB_ALIAS).filter(
+                recipe_id__in=changed
+            ).order_by('recipe_id').values_list('recipe_id', 'ingredient_id')
+            for recipe_id in changed:
+                self.remove(recipe_id)
+            for recipe_id, ingredient_id in rows:
+                self.add(recipe_id, ingredient_id)
+        self.position = position
+        return True
+
+    def search(self, ingredient_ids, limit):
+        """Рецепты, в которые входит хотя бы один из ингредиентов.
+
+        Возвращает список (id рецепта, доля имеющихся ингредиентов,
+        число имеющихся ингредиентов), лучшие совпадения первыми.
+        """
+        matched = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matched.update(self.postings.get(ingredient_id, ()))
+        ranked = heapq.nsmallest(limit, (
+            (-count / len(self.ingredients[recipe_id]), -count, recipe_id)
+            for recipe_id, count in matched.items()
+        ))
+        return [(recipe_id, -coverage, -count)
+                for coverage, count, recipe_id in ranked]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Индекс текущего процесса с применёнными изменениями рецептов."""
+    global _index
+    with _lock:
+        if _index is None or not _index.refresh():
+            _index = PantryIndex.build()
+        return _index
@@ -0,0 +1,158 @@
+import hashlib
+import weakref
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from ingredient.models import Ingredient
+from recipe import changes, shopping, units
+from recipe.models import IngredientRecipe, Recipe
+
+LOGIN_FIELDS = frozenset(('last_login', 'password'))
+
+
+def ingredients_hash(ingredient_ids):
+    """Хэш набора ингредиентов без учёта количества и порядка."""
+    key = ','.join(str(pk) for pk in sorted(set(ingredient_ids)))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def summarize_ingredients(items):
+    """Сводка по строкам (id ингредиента, единица измерения, количество).
+
+    Количества суммируются в базовых единицах: граммах и миллилитрах.
+    """
+    ingredient_ids = []
+    totals = {}
+    for ingredient_id, unit, amount in items:
+        ingredient_ids.append(ingredient_id)
+        unit, amount = units.normalize(unit, amount)
+        totals[unit] = totals.get(unit, 0) + amount
+    return {
+        'count': len(ingredient_ids),
+        'totals': {unit: units.to_number(amount)
+                   for unit, amount in totals.items()},
+        'hash': ingredients_hash(ingredient_ids),
+    }
+
+
+def build_ingredients_summary(ingredients):
+    """Сводка по ингредиентам из данных CreateRecipeSerializer."""
+    units = dict(Ingredient.objects.filter(
+        id__in=[ingredient['id'] for ingredient in ingredients]
+    ).values_list('id', 'measurement_unit'))
+    return summarize_ingredients(
+        (ingredient['id'], units.get(ingredient['id']), ingredient['amount'])
+        for ingredient in ingredients
+    )
+
+
+def recipes_changed(recipe_ids):
+    """Сбрасывает данные, посчитанные по ингредиентам рецептов.
+
+    Вызывается после фиксации транзакции, изменившей рецепты.
+    """
+    shopping.invalidate(recipe_ids)
+    changes.publish(recipe_ids)
+
+
+def touch_recipes(queryset):
+    """Обновляет дату изменения рецептов для условных запросов."""
+    queryset.update(updated_at=timezone.now())
+
+
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif pk_set:
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    else:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+def tag_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+def refresh_summaries(recipe_ids):
+    """Пересчитывает сводки ингредиентов рецептов по данным БД."""
+    rows = IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('recipe_id').values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__measurement_unit', 'amount'
+    )
+    summaries = {
+        recipe_id: summarize_ingredients(item[1:] for item in items)
+        for recipe_id, items in groupby(rows, key=lambda row: row[0])
+    }
+    now = timezone.now()
+    recipes = []
+    for recipe_id in recipe_ids:
+        summary = summaries.get(recipe_id) or summarize_ingredients(())
+        recipes.append(Recipe(id=recipe_id, ingredients_summary=summary,
+                              ingredients_hash=summary['hash'],
+                              updated_at=now))
+    Recipe.objects.bulk_update(
+        recipes, ['ingredients_summary', 'ingredients_hash', 'updated_at']
+    )
+
+
+_pending_refresh = weakref.WeakKeyDictionary()
+
+
+class IngredientsRefresh:
+    """Отложенный до фиксации транзакции пересчёт рецептов."""
+
+    def __init__(self, recipe_ids):
+        self.recipe_ids = set(recipe_ids)
+
+    def __call__(self):
+        recipe_ids = sorted(self.recipe_ids)
+        refresh_summaries(recipe_ids)
+        recipes_changed(recipe_ids)
+
+
+def schedule_refresh(recipe_ids):
+    """Пересчитывает сводки и сбрасывает кэши рецептов после фиксации.
+
+    Все изменения одной транзакции, например удаление строк
+    ингредиентов по одной, обрабатываются одним пересчётом. Ожидающий
+    пересчёт транзакции хранится по соединению в слабой ссылке: при
+    откате Django отбрасывает колбэк, и ссылка пропадает вместе с ним.
+    """
+    if not recipe_ids:
+        return
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        pending = _pending_refresh.get(connection)
+        refresh = pending() if pending is not None else None
+        if refresh is not None:
+            refresh.recipe_ids.update(recipe_ids)
+            return
+    refresh = IngredientsRefresh(recipe_ids)
+    if connection.in_atomic_block:
+        _pending_refresh[connection] = weakref.ref(refresh)
+    transaction.on_commit(refresh)
+
+
+def ingredient_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        schedule_refresh(list(Recipe.objects.filter(
+            ingredients=instance
+        ).values_list('pk', flat=True)))
+
+
+def ingredient_amount_changed(sender, instance, **kwargs):
+    schedule_refresh([instance.recipe_id])
+
+
+def author_changed(sender, instance, created=False, update_fields=None,
+                   **kwargs):
+    if created or (update_fields and LOGIN_FIELDS.issuperset(update_fields)):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
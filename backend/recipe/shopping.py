@@ -0,0 +1,97 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from app.models import ShoppingCart
+from recipe import units
+from recipe.models import IngredientRecipe
+
+CONTRIBUTION_KEY = 'shopping-contribution:{}'
+LIST_KEY = 'shopping-list:{}'
+TIMEOUT = 60 * 60 * 24
+
+
+def recipe_contributions(recipe_ids):
+    """Ингредиенты рецептов в базовых единицах за один проход по строкам.
+
+    Строки читаются из основной БД: результат кэшируется на сутки, и
+    отставшая реплика закрепила бы в кэше старый состав рецепта.
+    """
+    contributions = {recipe_id: {} for recipe_id in recipe_ids}
+    rows = IngredientRecipe.objects.using(DEFAULT_DB_ALIAS).filter(
+        recipe_id__in=recipe_ids
+    ).values_list(
+        'recipe_id', 'ingredient__name', 'ingredient__measurement_unit',
+        'amount',
+    ).iterator()
+    for recipe_id, name, unit, amount in rows:
+        unit, amount = units.normalize(unit, amount)
+        items = contributions[recipe_id]
+        items[name, unit] = items.get((name, unit), 0) + amount
+    return contributions
+
+
+def get_contributions(recipe_ids):
+    """Вклад рецептов в список покупок с кэшированием по рецепту.
+
+    Каждой записи кэша присваивается метка, по которой видно, что
+    рецепт изменился после сборки списка.
+    """
+    keys = {recipe_id: CONTRIBUTION_KEY.format(recipe_id)
+            for recipe_id in recipe_ids}
+    cached = cache.get_many(keys.values())
+    result = {recipe_id: cached[key] for recipe_id, key in keys.items()
+              if key in cached}
+    missing = [recipe_id for recipe_id in recipe_ids
+               if recipe_id not in result]
+    if missing:
+        computed = {
+            recipe_id: (uuid.uuid4().hex, items)
+            for recipe_id, items in recipe_contributions(missing).items()
+        }
+        cache.set_many({keys[recipe_id]: value
+                        for recipe_id, value in computed.items()}, TIMEOUT)
+        result.update(computed)
+    return result
+
+
+def invalidate(recipe_ids):
+    cache.delete_many([CONTRIBUTION_KEY.format(recipe_id)
+                       for recipe_id in recipe_ids])
+
+
+def shopping_list(user):
+    """Строки списка покупок (название, единица, количество).
+
+    Если корзина и рецепты в ней не менялись, возвращается список,
+    собранный при прошлом скачивании.
+    """
+    recipe_ids = sorted(ShoppingCart.objects.filter(
+        user=user
+    ).values_list('recipe_id', flat=True))
+    contributions = get_contributions(recipe_ids)
+    fingerprint = hashlib.sha1(','.join(
+        f'{recipe_id}:{contributions[recipe_id][0]}'
+        for recipe_id in recipe_ids
+    ).encode()).hexdigest()
+    key = LIST_KEY.format(user.id)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    totals = {}
+    for _, items in contributions.values():
+        for item, amount in items.items():
+            totals[item] = totals.get(item, 0) + amount
+    lines = [(name, *units.humanize(unit, amount))
+             for (name, unit), amount in sorted(totals.items())]
+    cache.set(key, (fingerprint, lines), TIMEOUT)
+    return lines
+
+
+def render_shopping_list(user):
+    """Текст списка покупок для скачивания."""
+    lines = [f'{name} - {units.format_amount(amount)} {unit}'
+             for name, unit, amount in shopping_list(user)]
+    return 'Список покупок:\n\n' + '\n'.join(lines)
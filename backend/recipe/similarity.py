@@ -0,0 +1,246 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from scipy.sparse import csr_matrix
+
+from ingredient.models import Ingredient
+from recipe import changes
+from recipe.models import IngredientRecipe
+
+ARRAYS = ('recipe_ids', 'ingredient_ids', 'indptr', 'indices', 'data')
+POINTER = 'current'
+KEEP_VERSIONS = 2
+REFRESH_INTERVAL = 5
+METRICS = ('jaccard', 'cosine')
+
+
+def build_arrays():
+    """Разреженная матрица рецепт × ингредиент в виде массивов CSR.
+
+    Возвращает массивы и позицию журнала изменений, с которой их нужно
+    дополнять.
+    """
+    position = changes.position()
+    # Строки с реплики могут отставать от позиции журнала, а матрица
+    # живёт дольше запроса, поэтому читаем основную БД.
+    ingredient_ids = np.array(
+        Ingredient.objects.using(DEFAULT_DB_ALIAS).order_by('id').values_list(
+            'id', flat=True
+        ),
+        dtype=np.int64,
+    )
+    columns = {pk: column for column, pk in enumerate(ingredient_ids.tolist())}
+    recipe_ids, starts, indices = [], [], []
+    rows = IngredientRecipe.objects.using(DEFAULT_DB_ALIAS).order_by(
+        'recipe_id', 'ingredient_id'
+    ).values_list('recipe_id', 'ingredient_id').iterator()
+    for recipe_id, ingredient_id in rows:
+        if not recipe_ids or recipe_ids[-1] != recipe_id:
+            recipe_ids.append(recipe_id)
+            starts.append(len(indices))
+        indices.append(columns[ingredient_id])
+    arrays = {
+        'recipe_ids': np.array(recipe_ids, dtype=np.int64),
+        'ingredient_ids': ingredient_ids,
+        'indptr': np.array(starts + [len(indices)], dtype=np.int32),
+        'indices': np.array(indices, dtype=np.int32),
+        'data': np.ones(len(indices), dtype=np.float32),
+    }
+    return arrays, position
+
+
+def save_arrays(arrays, position, directory=None):
+    """Сохраняет новую версию матрицы и переключает на неё указатель."""
+    directory = directory or settings.SIMILARITY_INDEX_DIR
+    version = str(time.time_ns())
+    path = os.path.join(directory, version)
+    os.makedirs(path)
+    for name in ARRAYS:
+        np.save(os.path.join(path, f'{name}.npy'), arrays[name])
+    with open(os.path.join(path, 'meta.json'), 'w') as file:
+        json.dump({'position': position}, file)
+    pointer = os.path.join(directory, POINTER)
+    with open(f'{pointer}.tmp', 'w') as file:
+        file.write(version)
+    os.replace(f'{pointer}.tmp', pointer)
+    versions = sorted(name for name in os.listdir(directory)
+                      if name.isdigit())
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return version
+
+
+def current_version(directory=None):
+    directory = directory or settings.SIMILARITY_INDEX_DIR
+    try:
+        with open(os.path.join(directory, POINTER)) as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def load_arrays(version, directory=None):
+    """Отображает сохранённые массивы в память без копирования."""
+    path = os.path.join(directory or settings.SIMILARITY_INDEX_DIR, version)
+    arrays = {
+        name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        for name in ARRAYS
+    }
+    with open(os.path.join(path, 'meta.json')) as file:
+        return arrays, json.load(file)['position']
+
+
+def load_ingredient_sets(recipe_ids):
+    sets = {}
+    rows = IngredientRecipe.objects.using(DEFAULT_DB_ALIAS).filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id')
+    for recipe_id, ingredient_id in rows:
+        sets.setdefault(recipe_id, set()).add(ingredient_id)
+    return {recipe_id: frozenset(ingredients)
+            for recipe_id, ingredients in sets.items()}
+
+
+def similarity(common, sizes, query_size, metric):
+    if metric == 'cosine':
+        return common / np.sqrt(sizes * query_size)
+    return common / (sizes + query_size - common)
+
+
+class SimilarityIndex:
+    """Похожие рецепты по пересечению наборов ингредиентов.
+
+    Рецепты, изменённые после сборки матрицы, исключаются из неё и
+    сравниваются по наборам из БД, пока матрицу не пересоберут.
+    """
+
+    def __init__(self, arrays, position, version=None):
+        self.version = version
+        self.position = position
+        self.recipe_ids = arrays['recipe_ids']
+        self.ingredient_ids = arrays['ingredient_ids']
+        self.matrix = csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']),
+            shape=(len(self.recipe_ids), len(self.ingredient_ids)),
+            copy=False,
+        )
+        self.sizes = np.diff(arrays['indptr'])
+        self.columns = {pk: column for column, pk
+                        in enumerate(self.ingredient_ids.tolist())}
+        self.masked = np.zeros(len(self.recipe_ids), dtype=bool)
+        self.overlay = {}
+        self.checked_at = time.monotonic()
+
+    def refresh(self):
+        """Применяет журнал изменений.
+
+        Возвращает False, если индекс устарел и его нужно загрузить заново.
+        """
+        if time.monotonic() - self.checked_at < REFRESH_INTERVAL:
+            return True
+        self.checked_at = time.monotonic()
+        if self.version is not None and self.version != current_version():
+            return False
+        position, changed = changes.collect(self.position)
+        if changed is None:
+            return False
+        if changed:
+            self.update(changed)
+        self.position = position
+        return True
+
+    def update(self, recipe_ids):
+        sets = load_ingredient_sets(recipe_ids)
+        for recipe_id in recipe_ids:
+            self.overlay[recipe_id] = sets.get(recipe_id, frozenset())
+            row = self.row(recipe_id)
+            if row is not None:
+                self.masked[row] = True
+
+    def row(self, recipe_id):
+        row = int(np.searchsorted(self.recipe_ids, recipe_id))
+        if row < len(self.recipe_ids) and self.recipe_ids[row] == recipe_id:
+            return row
+        return None
+
+    def ingredients_of(self, recipe_id):
+        if recipe_id in self.overlay:
+            return self.overlay[recipe_id]
+        row = self.row(recipe_id)
+        if row is None:
+            return load_ingredient_sets([recipe_id]).get(recipe_id,
+                                                         frozenset())
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return frozenset(
+            self.ingredient_ids[self.matrix.indices[start:end]].tolist()
+        )
+
+    def similar(self, recipe_id, limit, metric='jaccard'):
+        """Список (id рецепта, оценка) по убыванию сходства."""
+        query = self.ingredients_of(recipe_id)
+        if not query:
+            return []
+        vector = np.zeros(len(self.ingredient_ids), dtype=np.float32)
+        vector[[self.columns[pk] for pk in query if pk in self.columns]] = 1
+        scores = similarity(self.matrix.dot(vector), self.sizes, len(query),
+                            metric)
+        scores[self.masked] = 0
+        row = self.row(recipe_id)
+        if row is not None:
+            scores[row] = 0
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        ranked = [(int(self.recipe_ids[row]), float(scores[row]))
+                  for row in top if scores[row] > 0]
+        for other_id, ingredients in self.overlay.items():
+            common = len(query & ingredients)
+            if other_id != recipe_id and common:
+                ranked.append((other_id, float(similarity(
+                    common, len(ingredients), len(query), metric
+                ))))
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def load_index():
+    """Сохранённый индекс или None, если матрицу ещё не собирали."""
+    version = current_version()
+    if version is None:
+        return None
+    try:
+        return SimilarityIndex(*load_arrays(version), version=version)
+    except FileNotFoundError:
+        return None
+
+
+def preload():
+    """Загружает индекс при старте воркера, не обращаясь к БД."""
+    global _index
+    with _lock:
+        if _index is None:
+            _index = load_index()
+
+
+def get_index():
+    """Индекс текущего процесса с применёнными изменениями рецептов.
+
+    Если матрица не собрана командой build_similarity_index, она
+    строится в памяти из БД.
+    """
+    global _index
+    with _lock:
+        if _index is None or not _index.refresh():
+            _index = load_index() or SimilarityIndex(*build_arrays())
+        return _index
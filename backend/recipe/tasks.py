@@ -0,0 +1,82 @@
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image
+
+from jobs.queue import enqueue
+from jobs.registry import task
+from recipe.models import Recipe
+from recipe.shopping import render_shopping_list
+from users.models import User
+
+IMAGE_RENDITIONS = 'recipe.image_renditions'
+EXPORT_SHOPPING_LIST = 'recipe.export_shopping_list'
+DELETE_FILES = 'recipe.delete_files'
+
+
+@task(IMAGE_RENDITIONS)
+def make_image_renditions(recipe_id):
+    """Уменьшенные копии фото рецепта шириной RECIPE_IMAGE_WIDTHS."""
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'id', 'image', 'image_renditions'
+    ).first()
+    if recipe is None or not recipe.image:
+        return {}
+    storage = recipe.image.storage
+    with recipe.image.open('rb') as file:
+        image = Image.open(file)
+        image.load()
+    image = image.convert('RGB')
+    renditions = {}
+    for width in settings.RECIPE_IMAGE_WIDTHS:
+        if image.width <= width:
+            continue
+        copy = image.copy()
+        copy.thumbnail((width, image.height))
+        buffer = BytesIO()
+        copy.save(buffer, 'JPEG', quality=85, optimize=True)
+        renditions[str(width)] = storage.save(
+            f'media/renditions/{recipe.id}/{width}.jpg',
+            ContentFile(buffer.getvalue()),
+        )
+    updated = Recipe.objects.filter(
+        pk=recipe.id, image=recipe.image.name
+    ).update(image_renditions=renditions, updated_at=timezone.now())
+    if not updated:
+        # Фото заменили или рецепт удалили, пока строились копии.
+        for name in renditions.values():
+            storage.delete(name)
+        return {}
+    for name in recipe.image_renditions.values():
+        if name not in renditions.values():
+            storage.delete(name)
+    return renditions
+
+
+@task(EXPORT_SHOPPING_LIST, max_attempts=3)
+def export_shopping_list(user_id):
+    """Файл списка покупок пользователя.
+
+    Файл хранится EXPORTS_RETENTION секунд, затем его удаляет
+    отложенная задача.
+    """
+    content = render_shopping_list(User.objects.get(pk=user_id))
+    name = default_storage.save(
+        f'exports/{uuid.uuid4().hex}/shopping_cart.txt',
+        ContentFile(content.encode()),
+    )
+    enqueue(DELETE_FILES, {'names': [name]},
+            delay=settings.EXPORTS_RETENTION)
+    return {'file': name}
+
+
+@task(DELETE_FILES)
+def delete_files(names):
+    """Файлы удалённых рецептов, заменённых фото и устаревших выгрузок."""
+    for name in names:
+        default_storage.delete(name)
+    return {'deleted': len(names)}
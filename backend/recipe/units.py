@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+GRAM = 'г'
+MILLILITER = 'мл'
+
+CONVERSIONS = {
+    'г': (GRAM, Decimal(1)),
+    'кг': (GRAM, Decimal(1000)),
+    'мл': (MILLILITER, Decimal(1)),
+    'л': (MILLILITER, Decimal(1000)),
+    'стакан': (MILLILITER, Decimal(200)),
+    'ст. л.': (MILLILITER, Decimal(15)),
+    'ч. л.': (MILLILITER, Decimal(5)),
+    'капля': (MILLILITER, Decimal('0.05')),
+}
+LARGER_UNITS = {
+    GRAM: ('кг', Decimal(1000)),
+    MILLILITER: ('л', Decimal(1000)),
+}
+
+
+def normalize(unit, amount):
+    """Количество в базовой единице: граммах или миллилитрах.
+
+    Единицы без пересчёта (шт., по вкусу, пучок...) возвращаются как есть.
+    """
+    base, factor = CONVERSIONS.get(unit, (unit, 1))
+    return base, amount * factor
+
+
+def humanize(unit, amount):
+    """Переводит большие количества в килограммы и литры."""
+    larger, factor = LARGER_UNITS.get(unit, (None, None))
+    if larger and amount >= factor:
+        return larger, amount / factor
+    return unit, amount
+
+
+def format_amount(amount):
+    return format(Decimal(amount).normalize(), 'f')
+
+
+def to_number(amount):
+    """Количество для JSON: целое, если дробной части нет."""
+    return int(amount) if amount == int(amount) else float(amount)
@@ -1,10 +1,13 @@
 from django.contrib import admin
 
+from app.admin import ChunkedDeleteAdminMixin
+from app.deletion import delete_users
+
 from .models import User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(ChunkedDeleteAdminMixin, admin.ModelAdmin):
     list_display = (
         'id',
         'username',
@@ -12,6 +15,7 @@ class UserAdmin(admin.ModelAdmin):
         'first_name',
         'last_name',
     )
-    list_filter = ('email', 'username',)
+    list_filter = ('is_staff', 'is_active',)
     search_fields = ('email', 'username',)
     empty_value_display = '-пусто-'
+    deletion = staticmethod(delete_users)